@@ -15,7 +15,7 @@ echo ""
 cd "$PROJECT_ROOT"
 
 # Run the Python build script
-python3 scripts/build_app.py
+python3 scripts/build_app.py "$@"
 
 echo ""
 echo "Build complete!"
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """Build script for packaging BashRunner with PyInstaller."""
 
+import argparse
+import hashlib
+import os
 import shutil
 import subprocess
 import sys
+from importlib import metadata
 from pathlib import Path
 
 from loguru import logger
@@ -18,6 +22,7 @@ SRC_DIR = PROJECT_ROOT / "src"
 DIST_DIR = PROJECT_ROOT / "dist"
 BUILD_DIR = PROJECT_ROOT / "build"
 SPEC_FILE = PROJECT_ROOT / "BashRunner.spec"
+CACHE_ROOT = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "bashrunner-build"
 
 # App metadata
 APP_NAME = "BashRunner"
@@ -25,10 +30,30 @@ APP_VERSION = "0.1.0"
 ENTRY_POINT = SRC_DIR / "bashrunner" / "main.py"
 
 
+def _package_version(name: str) -> str:
+    """Get an installed package's version, or "missing" if it is not installed."""
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "missing"
+
+
+def get_work_dir() -> Path:
+    """Get the persistent PyInstaller work directory for the current toolchain.
+
+    The directory is keyed on the Python, PySide6 and PyInstaller versions, so
+    the analyzed and packed Qt bundle is reused across builds and across
+    checkouts, and is only redone when one of those changes.
+    """
+    versions = "|".join([sys.version, _package_version("PySide6"), _package_version("pyinstaller")])
+    key = hashlib.sha256(versions.encode()).hexdigest()[:16]
+    return CACHE_ROOT / key
+
+
 def clean_build_artifacts():
     """Remove previous build artifacts."""
     logger.info("Cleaning previous build artifacts...")
-    for directory in [DIST_DIR, BUILD_DIR]:
+    for directory in [DIST_DIR, BUILD_DIR, get_work_dir()]:
         if directory.exists():
             shutil.rmtree(directory)
             logger.info(f"Removed {directory}")
@@ -37,9 +62,14 @@ def clean_build_artifacts():
         logger.info(f"Removed {SPEC_FILE}")
 
 
-def build_app():
-    """Build the application using PyInstaller."""
-    logger.info(f"Building {APP_NAME} v{APP_VERSION}...")
+def build_app(full: bool = False):
+    """Build the application using PyInstaller.
+
+    Args:
+        full: Clear PyInstaller's cache and re-analyze everything from scratch.
+            Otherwise the previous work directory is reused for an incremental build.
+    """
+    logger.info(f"Building {APP_NAME} v{APP_VERSION} ({'full' if full else 'incremental'})...")
 
     # PyInstaller command
     cmd = [
@@ -48,7 +78,8 @@ def build_app():
         APP_NAME,
         "--windowed",  # No console window (GUI app)
         "--onedir",  # Create a folder with all dependencies
-        "--clean",  # Clean cache before building
+        "--noconfirm",  # Replace the previous output without prompting
+        f"--workpath={get_work_dir()}",  # Persistent cache keyed on dependency versions
         # macOS specific options
         "--osx-bundle-identifier",
         "com.bashrunner.app",
@@ -67,6 +98,8 @@ def build_app():
         # Entry point
         str(ENTRY_POINT),
     ]
+    if full:
+        cmd.insert(-1, "--clean")  # Clean cache before building
 
     logger.info(f"Running: {' '.join(cmd)}")
     result = subprocess.run(cmd, cwd=PROJECT_ROOT)
@@ -79,8 +112,26 @@ def build_app():
     logger.info(f"Application bundle: {DIST_DIR / APP_NAME}")
 
 
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description=f"Package {APP_NAME} with PyInstaller.",
+        epilog="Builds are incremental by default and reuse PyInstaller's work directory "
+        f"under {CACHE_ROOT}. "
+        "Use --full when the bundle looks stale; it removes the work directory, build/, "
+        "dist/ and the spec file and clears PyInstaller's cache first.",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="clean all build artifacts and rebuild from scratch",
+    )
+    return parser.parse_args(argv)
+
+
 def main():
     """Main build process."""
+    args = parse_args()
     logger.info(f"Starting build process for {APP_NAME}...")
 
     # Check if PyInstaller is installed
@@ -92,10 +143,11 @@ def main():
         sys.exit(1)
 
     # Clean previous builds
-    clean_build_artifacts()
+    if args.full:
+        clean_build_artifacts()
 
     # Build the app
-    build_app()
+    build_app(full=args.full)
 
     # Display final info
     logger.info("\n" + "=" * 60)
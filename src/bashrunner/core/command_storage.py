@@ -1,19 +1,170 @@
 """Command storage and management system."""
 
+import atexit
+import codecs
+import contextlib
+import errno
+import functools
 import json
+import mmap
+import os
+import selectors
+import shlex
+import shutil
 import subprocess
 import sys
 import threading
-from dataclasses import asdict, dataclass
+import time
+import weakref
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional
+from typing import IO, Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from loguru import logger
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
 
-@dataclass
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional speedup
+    ijson = None  # type: ignore[assignment]
+
+# Seconds to wait after a mutation before writing, so bursts of edits share one write
+_SAVE_DELAY = 0.5
+
+# Set BASHRUNNER_PRETTY_JSON=1 to write an indented, human-friendly commands file
+_PRETTY_JSON = bool(os.environ.get("BASHRUNNER_PRETTY_JSON"))
+
+# Set BASHRUNNER_DISCARD_OUTPUT=1 to send command output nobody reads to /dev/null rather
+# than to the terminal BashRunner was started from
+_INHERIT_OUTPUT = not os.environ.get("BASHRUNNER_DISCARD_OUTPUT")
+
+# Commands files larger than this are stream-parsed when ijson is available
+_STREAM_THRESHOLD = 1 << 20
+
+# Commands files larger than this are parsed from a memory map when orjson is available
+_MMAP_THRESHOLD = 256 << 10
+
+# Per-platform app data directory, resolved once since neither the platform nor HOME changes
+_DEFAULT_STORAGE_PATH = Path.home() / {
+    "win32": "AppData/Roaming/BashRunner",
+    "darwin": "Library/Application Support/BashRunner",
+}.get(sys.platform, ".config/bashrunner")
+
+# Characters that only a shell can interpret: pipes, redirects, expansions, globs, grouping
+_SHELL_CHARS = frozenset("|&;<>$`*?[]{}()~#\n")
+
+# Shell builtins and keywords. Some also exist as programs on PATH (echo, printf, test, pwd,
+# kill), but those can behave differently, so these commands always go to the shell.
+_SHELL_BUILTINS = frozenset(
+    """
+    ! . : [ [[ { } alias bg break builtin case cd command continue declare do done echo elif
+    else esac eval exec exit export false fc fg fi for function getopts hash if jobs kill let
+    local printf pwd read readonly return select set shift source test then time times trap
+    true type typeset ulimit umask unalias unset until wait while
+    """.split()
+)
+
+# Slotted dataclasses (smaller instances, faster attribute access) need Python 3.10+
+_DATACLASS_OPTIONS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Bytes read from a command's output pipe per wakeup of the IO thread
+_PIPE_READ_SIZE = 64 << 10
+
+# Windows selectors only accept sockets, so pipes there get a blocking reader thread each
+_SELECT_PIPES = sys.platform != "win32"
+
+# Commands are only split and exec'd directly with POSIX shell rules; cmd.exe quotes and
+# builtins differ, so elsewhere every command goes to the shell
+_EXEC_DIRECT = os.name == "posix"
+
+_utf8_decoder = codecs.getincrementaldecoder("utf-8")
+
+# How long a successful script existence check is reused, in nanoseconds
+_SCRIPT_CHECK_TTL_NS = 5_000_000_000
+
+
+def _json_loads(raw: bytes) -> Any:
+    """Parse JSON bytes, preferring orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumps(data: Any) -> bytes:
+    """Serialize data to UTF-8 JSON bytes, compact unless pretty output is enabled.
+
+    Commands may be passed as is: orjson serializes dataclasses natively, and the
+    stdlib fallback converts them through Command.to_dict.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if _PRETTY_JSON else 0)
+    options: Dict[str, Any] = {"indent": 2} if _PRETTY_JSON else {"separators": (",", ":")}
+    text = json.dumps(data, default=Command.to_dict, ensure_ascii=False, **options)
+    return text.encode("utf-8")
+
+
+@functools.lru_cache(maxsize=128)
+def _cached_exists(path: str, bucket: int) -> bool:
+    """Check whether a path exists; bucket is part of the cache key so entries expire."""
+    return os.path.exists(path)
+
+
+def _script_exists(path: str) -> bool:
+    """Check whether a script exists, reusing recent successful checks.
+
+    Repeated runs of the same script skip the stat call for a few seconds.
+    Misses are always re-checked so a newly created script is found at once.
+    """
+    bucket = time.monotonic_ns() // _SCRIPT_CHECK_TTL_NS
+    return _cached_exists(path, bucket) or os.path.exists(path)
+
+
+@functools.lru_cache(maxsize=256)
+def _resolve_executable(name: str, search_path: Optional[str]) -> Optional[str]:
+    """Resolve an executable on a PATH once, instead of on every launch.
+
+    The PATH is part of the cache key, so changing it resolves names afresh.
+    """
+    return shutil.which(name, path=search_path)
+
+
+def _find_executable(program: str) -> Optional[str]:
+    """Get the executable to run for a program name, or None if it isn't found."""
+    # Paths are used as given; only bare names are looked up on PATH
+    if os.sep in program or (os.altsep and os.altsep in program):
+        return program
+    return _resolve_executable(program, os.environ.get("PATH"))
+
+
+def _split_simple_command(command: str) -> Optional[List[str]]:
+    """Split a command into an argv list if it can run without a shell.
+
+    Returns:
+        The argv list, or None if the command needs a shell to interpret it.
+    """
+    if not _EXEC_DIRECT or not _SHELL_CHARS.isdisjoint(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    # Leading VAR=value assignments are shell syntax too
+    if not argv or "=" in argv[0] or argv[0] in _SHELL_BUILTINS:
+        return None
+    return argv
+
+
+@dataclass(frozen=True, **_DATACLASS_OPTIONS)
 class Command:
-    """Represents a single command or script."""
+    """Represents a single command or script.
+
+    Commands are immutable, so the snapshots returned by get_commands() can share
+    them safely; edits go through CommandStorage.update() with a new instance.
+    """
 
     name: str
     command_type: str  # 'single', 'multi', or 'script'
@@ -22,58 +173,94 @@ class Command:
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
-        return asdict(self)
+        return {
+            "name": self.name,
+            "command_type": self.command_type,
+            "content": self.content,
+            "description": self.description,
+        }
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Command":
         """Create from dictionary."""
-        return cls(**data)
+        # Interning makes every loaded command share one string per type
+        command_type = sys.intern(data["command_type"])
+        return cls(data["name"], command_type, data["content"], data.get("description", ""))
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class _PipeReader:
+    """Output pipe watched by the IO thread, with its partially read line."""
+
+    stream: IO[bytes]
+    callback: Callable[[str], None]
+    decoder: codecs.IncrementalDecoder
+    partial: str = ""
 
 
 class CommandStorage:
     """Manages command storage and persistence."""
 
-    def __init__(self, storage_path: Optional[Path] = None):
+    def __init__(self, storage_path: Optional[Path] = None, inherit_output: Optional[bool] = None):
         """Initialize command storage.
 
         Args:
             storage_path: Path to store commands. Defaults to app data directory.
+            inherit_output: Whether streams without a callback go to this process's
+                terminal. When False they are sent to /dev/null instead. Defaults to
+                True unless BASHRUNNER_DISCARD_OUTPUT is set.
         """
         if storage_path is None:
-            storage_path = self._get_default_storage_path()
+            storage_path = _DEFAULT_STORAGE_PATH
 
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
         self.commands_file = self.storage_path / "commands.json"
+        self.inherit_output = _INHERIT_OUTPUT if inherit_output is None else inherit_output
         self._commands: List[Command] = []
+        self._view: Optional[Tuple[Command, ...]] = None
+        self._by_name: Dict[str, int] = {}
         self._output_callback: Optional[Callable[[str], None]] = None
         self._error_callback: Optional[Callable[[str], None]] = None
-        self._load_commands()
+        self._save_cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending: Optional[Sequence[Command]] = None
+        self._last_saved: Optional[bytes] = None
+        self._writer: Optional[threading.Thread] = None
+        self._batch_depth = 0
+        self._io_lock = threading.Lock()
+        self._io_selector: Optional[selectors.BaseSelector] = None
+        self._batch_dirty = False
+        self._executors: Dict[str, Callable[[str, str], bool]] = {
+            "single": self._execute_single_command,
+            "multi": self._execute_multi_commands,
+            "script": self._execute_script,
+        }
+        self._loaded = False
+        _open_storages.add(self)
 
     def set_output_callback(self, callback: Optional[Callable[[str], None]]) -> None:
-        """Set callback for stdout output."""
+        """Set callback for stdout output.
+
+        The callback receives complete lines, possibly several in one call.
+        """
         self._output_callback = callback
 
     def set_error_callback(self, callback: Optional[Callable[[str], None]]) -> None:
         """Set callback for stderr output."""
         self._error_callback = callback
 
-    def _get_default_storage_path(self) -> Path:
-        """Get the default storage path based on platform."""
-        if sys.platform == "win32":
-            return Path.home() / "AppData" / "Roaming" / "BashRunner"
-        elif sys.platform == "darwin":
-            return Path.home() / "Library" / "Application Support" / "BashRunner"
-        else:
-            return Path.home() / ".config" / "bashrunner"
+    def _ensure_loaded(self) -> None:
+        """Load the commands file on first use, keeping it off the startup path."""
+        if not self._loaded:
+            self._loaded = True
+            self._load_commands()
 
     def _load_commands(self) -> None:
         """Load commands from storage file."""
         if self.commands_file.exists():
             try:
-                with open(self.commands_file, encoding="utf-8") as f:
-                    data = json.load(f)
-                    self._commands = [Command.from_dict(cmd) for cmd in data.get("commands", [])]
+                self._commands = [Command.from_dict(cmd) for cmd in self._read_command_dicts()]
                 logger.info(f"Loaded {len(self._commands)} commands from storage")
             except Exception as e:
                 logger.error(f"Failed to load commands: {e}")
@@ -81,25 +268,150 @@ class CommandStorage:
         else:
             logger.info("No existing commands file found, starting fresh")
             self._commands = []
-
-    def _save_commands(self) -> None:
-        """Save commands to storage file."""
+        self._reindex()
+
+    def _reindex(self) -> None:
+        """Rebuild the name to index lookup after the command list changes."""
+        by_name: Dict[str, int] = {}
+        for i, command in enumerate(self._commands):
+            by_name.setdefault(command.name, i)
+        self._by_name = by_name
+
+    def _read_command_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Read the raw command dictionaries from the storage file.
+
+        Very large files are streamed with ijson so the parsed document never
+        sits in memory alongside the Command objects built from it. Large files
+        are parsed by orjson straight from a memory map, skipping the copy into
+        a bytes object.
+        """
+        with open(self.commands_file, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if ijson is not None and size > _STREAM_THRESHOLD:
+                yield from ijson.items(f, "commands.item")
+                return
+            data = self._parse_file(f, size)
+        yield from data.get("commands", [])
+
+    @staticmethod
+    def _parse_file(f: BinaryIO, size: int) -> Any:
+        """Parse an open storage file, memory-mapping it when that pays off.
+
+        Mapping can fail on special files or filesystems that do not support
+        it; those are read normally instead.
+        """
+        if orjson is not None and size > _MMAP_THRESHOLD:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    with memoryview(mm) as view:
+                        return orjson.loads(view)
+            except (ValueError, OSError) as e:
+                logger.debug(f"Could not memory-map commands file, reading it instead: {e}")
+        return _json_loads(f.read())
+
+    def _save_commands(self, commands: Sequence[Command]) -> None:
+        """Save a snapshot of the commands to the storage file.
+
+        Writes to a temporary file, syncs it to disk and swaps it in, so neither a
+        crash mid-write nor a power loss leaves a truncated commands file behind.
+        Nothing is written when the contents match the last save.
+        """
         try:
-            data = {"commands": [cmd.to_dict() for cmd in self._commands]}
-            with open(self.commands_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            logger.info(f"Saved {len(self._commands)} commands to storage")
+            payload = _json_dumps({"commands": commands})
+            if payload == self._last_saved:
+                return
+            tmp_file = self.commands_file.with_suffix(".json.tmp")
+            with open(tmp_file, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.commands_file)
+            self._last_saved = payload
+            logger.info(f"Saved {len(commands)} commands to storage")
         except Exception as e:
             logger.error(f"Failed to save commands: {e}")
 
-    def get_commands(self) -> List[Command]:
-        """Get all commands."""
-        return self._commands.copy()
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group several mutations so they are queued for saving only once.
+
+        Batches may be nested; the save is queued when the outermost one exits.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._batch_dirty:
+                self._batch_dirty = False
+                self._mark_dirty()
+
+    def _mark_dirty(self) -> None:
+        """Queue a snapshot of the commands for the background writer."""
+        self._view = None
+        if self._batch_depth:
+            self._batch_dirty = True
+            return
+        with self._save_cond:
+            self._pending = self.get_commands()
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name="commands-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _writer_loop(self) -> None:
+        """Write queued snapshots, coalescing bursts of changes into one save.
+
+        The thread exits once nothing is queued, so an idle storage can be freed.
+        """
+        while True:
+            time.sleep(_SAVE_DELAY)
+            self.flush()
+            with self._save_cond:
+                if self._pending is None:
+                    self._writer = None
+                    return
+
+    def flush(self) -> None:
+        """Write pending changes to disk, waiting for any save in progress."""
+        with self._write_lock:
+            with self._save_cond:
+                commands, self._pending = self._pending, None
+            if commands is not None:
+                self._save_commands(commands)
+
+    def close(self) -> None:
+        """Write pending changes to disk and stop tracking the storage for exit."""
+        self.flush()
+        _open_storages.discard(self)
+
+    def get_commands(self) -> Tuple[Command, ...]:
+        """Get all commands.
+
+        The returned tuple is cached and shared between callers until the next change.
+        """
+        self._ensure_loaded()
+        if self._view is None:
+            self._view = tuple(self._commands)
+        return self._view
+
+    def get_index(self, name: str) -> Optional[int]:
+        """Get the index of the first command with the given name, or None."""
+        self._ensure_loaded()
+        return self._by_name.get(name)
+
+    def get_by_name(self, name: str) -> Optional[Command]:
+        """Get the first command with the given name, or None."""
+        index = self.get_index(name)
+        return None if index is None else self._commands[index]
 
     def add_command(self, command: Command) -> None:
         """Add a new command."""
+        self._ensure_loaded()
         self._commands.append(command)
-        self._save_commands()
+        self._by_name.setdefault(command.name, len(self._commands) - 1)
+        self._mark_dirty()
         logger.info(f"Added command: {command.name}")
 
     def update_command(self, index: int, command: Command) -> bool:
@@ -108,9 +420,11 @@ class CommandStorage:
         Returns:
             True if update was successful, False otherwise.
         """
+        self._ensure_loaded()
         if 0 <= index < len(self._commands):
             self._commands[index] = command
-            self._save_commands()
+            self._reindex()
+            self._mark_dirty()
             logger.info(f"Updated command at index {index}: {command.name}")
             return True
         else:
@@ -123,9 +437,11 @@ class CommandStorage:
         Returns:
             True if deletion was successful, False otherwise.
         """
+        self._ensure_loaded()
         if 0 <= index < len(self._commands):
             deleted = self._commands.pop(index)
-            self._save_commands()
+            self._reindex()
+            self._mark_dirty()
             logger.info(f"Deleted command: {deleted.name}")
             return True
         else:
@@ -138,10 +454,17 @@ class CommandStorage:
         Returns:
             True if move was successful, False otherwise.
         """
+        self._ensure_loaded()
         if 0 <= from_index < len(self._commands) and 0 <= to_index < len(self._commands):
-            command = self._commands.pop(from_index)
-            self._commands.insert(to_index, command)
-            self._save_commands()
+            if abs(from_index - to_index) == 1:
+                # Adjacent moves (move up/down) are a plain swap
+                commands = self._commands
+                commands[from_index], commands[to_index] = commands[to_index], commands[from_index]
+            else:
+                command = self._commands.pop(from_index)
+                self._commands.insert(to_index, command)
+            self._reindex()
+            self._mark_dirty()
             logger.info(f"Moved command from index {from_index} to {to_index}")
             return True
         else:
@@ -154,142 +477,175 @@ class CommandStorage:
         Returns:
             True if execution was successful, False otherwise.
         """
+        self._ensure_loaded()
         if not (0 <= index < len(self._commands)):
             logger.error(f"Invalid command index: {index}")
             return False
 
         command = self._commands[index]
+        handler = self._executors.get(command.command_type)
+        if handler is None:
+            logger.error(f"Unknown command type: {command.command_type}")
+            return False
         try:
-            if command.command_type == "single":
-                return self._execute_single_command(command.content, command.name)
-            elif command.command_type == "multi":
-                return self._execute_multi_commands(command.content, command.name)
-            elif command.command_type == "script":
-                return self._execute_script(command.content, command.name)
-            else:
-                logger.error(f"Unknown command type: {command.command_type}")
-                return False
+            return handler(command.content, command.name)
         except Exception as e:
             logger.error(f"Failed to execute command '{command.name}': {e}")
             return False
 
-    def _read_stream(self, stream, callback: Optional[Callable[[str], None]]) -> None:
-        """Read from a stream and call callback for each line."""
-        if stream is None or callback is None:
+    def _stream_target(self, callback: Optional[Callable[[str], None]]) -> Optional[int]:
+        """Get the Popen target for a stream: our pipe, the terminal, or /dev/null."""
+        if callback is not None:
+            return subprocess.PIPE
+        return None if self.inherit_output else subprocess.DEVNULL
+
+    def _watch_stream(self, stream: IO[bytes], callback: Callable[[str], None]) -> None:
+        """Stream a pipe's output to callback, line by line, from the shared IO thread.
+
+        Where pipes can't be selected on, each pipe is read by a thread of its own.
+        """
+        reader = _PipeReader(stream, callback, _utf8_decoder(errors="replace"))
+        if not _SELECT_PIPES:
+            threading.Thread(
+                target=self._drain_pipe, args=(reader,), name="command-output", daemon=True
+            ).start()
             return
+        os.set_blocking(stream.fileno(), False)
+        with self._io_lock:
+            if self._io_selector is None:
+                self._io_selector = selectors.DefaultSelector()
+                threading.Thread(target=self._io_loop, name="command-output", daemon=True).start()
+            self._io_selector.register(stream, selectors.EVENT_READ, reader)
+
+    def _io_loop(self) -> None:
+        """Read every watched pipe as it becomes readable."""
+        assert self._io_selector is not None
+        while True:
+            for key, _ in self._io_selector.select():
+                if not self._read_pipe(key.data):
+                    with self._io_lock:
+                        self._io_selector.unregister(key.fileobj)
+                    key.data.stream.close()
+
+    def _drain_pipe(self, reader: _PipeReader) -> None:
+        """Read a blocking pipe until EOF, then close it."""
+        while self._read_pipe(reader):
+            pass
+        reader.stream.close()
+
+    def _read_pipe(self, reader: _PipeReader) -> bool:
+        """Emit the complete lines available on a pipe.
+
+        All lines from one read go to the callback in a single call.
+
+        Returns:
+            False once the pipe has reached EOF, True while more output may follow.
+        """
+        try:
+            data = os.read(reader.stream.fileno(), _PIPE_READ_SIZE)
+        except BlockingIOError:
+            return True
+        except OSError as e:
+            logger.error(f"Error reading stream: {e}")
+            data = b""
+
+        text = reader.partial + reader.decoder.decode(data, final=not data)
+        if data:
+            # Hold back a trailing partial line until the rest of it arrives
+            end = text.rfind("\n") + 1
+            text, reader.partial = text[:end], text[end:]
         try:
-            for line in iter(stream.readline, b""):
-                if line:
-                    text = line.decode("utf-8", errors="replace")
-                    callback(text)
+            if text:
+                reader.callback(text)
         except Exception as e:
             logger.error(f"Error reading stream: {e}")
-        finally:
-            if stream:
-                stream.close()
 
-    def _execute_single_command(self, command: str, name: str) -> bool:
-        """Execute a single shell command.
+        return bool(data)
 
-        Captures stdout and stderr, streaming to callbacks if set.
+    def _spawn(
+        self, kind: str, name: str, script: str, header: str, argv: Optional[List[str]] = None
+    ) -> bool:
+        """Start a command in the background, wiring its output to the callbacks.
+
+        Args:
+            kind: What is being run, used in log messages.
+            name: Name of the command being run.
+            script: Shell script to run.
+            header: Text sent to the output callback before the command starts.
+            argv: Equivalent argv to exec directly, saving the intermediate /bin/sh
+                process, when its program is an executable on PATH.
         """
         try:
-            logger.info(f"Executing single command '{name}': {command}")
-
             if self._output_callback:
-                self._output_callback(f"$ {command}\n")
-
-            # Use Popen to capture output
-            process = subprocess.Popen(
-                command,
-                shell=True,
-                stdin=subprocess.DEVNULL,
-                stdout=subprocess.PIPE if self._output_callback else None,
-                stderr=subprocess.PIPE if self._error_callback else None,
-                start_new_session=True,
-            )
-
-            # Start threads to read stdout and stderr
-            if self._output_callback and process.stdout:
-                stdout_thread = threading.Thread(
-                    target=self._read_stream,
-                    args=(process.stdout, self._output_callback),
-                    daemon=True,
-                )
-                stdout_thread.start()
-
-            if self._error_callback and process.stderr:
-                stderr_thread = threading.Thread(
-                    target=self._read_stream,
-                    args=(process.stderr, self._error_callback),
-                    daemon=True,
-                )
-                stderr_thread.start()
-
-            logger.info(f"Command '{name}' started with PID {process.pid}")
+                self._output_callback(header)
+
+            popen_kwargs: Dict[str, Any] = {
+                "stdin": subprocess.DEVNULL,
+                "stdout": self._stream_target(self._output_callback),
+                "stderr": self._stream_target(self._error_callback),
+                "start_new_session": True,
+            }
+
+            # Anything that isn't an executable on PATH goes to the shell
+            process = None
+            executable = _find_executable(argv[0]) if argv is not None else None
+            if argv is not None and executable is not None:
+                try:
+                    process = subprocess.Popen(argv, executable=executable, **popen_kwargs)
+                except OSError as e:
+                    if e.errno == errno.ENOENT:
+                        # Removed since it was resolved: forget the stale lookups
+                        _resolve_executable.cache_clear()
+                    # Let the shell run it, as it would a script without a shebang
+                    process = None
+            if process is None:
+                process = subprocess.Popen(script, shell=True, **popen_kwargs)
+
+            # Hand the pipes to the shared IO thread
+            for stream, callback in (
+                (process.stdout, self._output_callback),
+                (process.stderr, self._error_callback),
+            ):
+                if stream is not None and callback is not None:
+                    self._watch_stream(stream, callback)
+
+            logger.info(f"{kind} '{name}' started with PID {process.pid}")
             return True
         except Exception as e:
-            logger.error(f"Exception executing command '{name}': {e}")
+            logger.error(f"Exception executing {kind.lower()} '{name}': {e}")
             if self._error_callback:
                 self._error_callback(f"Error: {e}\n")
             return False
 
+    def _execute_single_command(self, command: str, name: str) -> bool:
+        """Execute a single shell command.
+
+        Captures stdout and stderr, streaming to callbacks if set.
+        """
+        logger.info(f"Executing single command '{name}': {command}")
+        return self._spawn(
+            "Command", name, command, f"$ {command}\n", _split_simple_command(command)
+        )
+
     def _execute_multi_commands(self, commands_text: str, name: str) -> bool:
         """Execute multiple shell commands separated by newlines.
 
         Commands are combined and executed as a single shell script to properly
         handle directory changes, environment setup, and GUI application launches.
         """
-        try:
-            commands = [cmd.strip() for cmd in commands_text.split("\n") if cmd.strip()]
-            if not commands:
-                logger.warning(f"No commands to execute in '{name}'")
-                return False
-
-            # Combine commands into a single shell script with proper error handling
-            # Using newlines preserves command structure (cd, etc.)
-            combined_script = "\n".join(commands)
-
-            logger.info(f"Executing multicommand '{name}' with {len(commands)} command(s)")
-
-            if self._output_callback:
-                for cmd in commands:
-                    self._output_callback(f"$ {cmd}\n")
-
-            # Use Popen to capture output
-            process = subprocess.Popen(
-                combined_script,
-                shell=True,
-                stdin=subprocess.DEVNULL,
-                stdout=subprocess.PIPE if self._output_callback else None,
-                stderr=subprocess.PIPE if self._error_callback else None,
-                start_new_session=True,
-            )
-
-            # Start threads to read stdout and stderr
-            if self._output_callback and process.stdout:
-                stdout_thread = threading.Thread(
-                    target=self._read_stream,
-                    args=(process.stdout, self._output_callback),
-                    daemon=True,
-                )
-                stdout_thread.start()
+        # Using newlines preserves command structure (cd, etc.)
+        combined_script = "\n".join(
+            stripped for line in commands_text.splitlines() if (stripped := line.strip())
+        )
+        if not combined_script:
+            logger.warning(f"No commands to execute in '{name}'")
+            return False
 
-            if self._error_callback and process.stderr:
-                stderr_thread = threading.Thread(
-                    target=self._read_stream,
-                    args=(process.stderr, self._error_callback),
-                    daemon=True,
-                )
-                stderr_thread.start()
+        command_count = combined_script.count("\n") + 1
+        logger.info(f"Executing multicommand '{name}' with {command_count} command(s)")
 
-            logger.info(f"Multicommand '{name}' started with PID {process.pid}")
-            return True
-        except Exception as e:
-            logger.error(f"Exception executing multi commands '{name}': {e}")
-            if self._error_callback:
-                self._error_callback(f"Error: {e}\n")
-            return False
+        header = "$ " + combined_script.replace("\n", "\n$ ") + "\n"
+        return self._spawn("Multicommand", name, combined_script, header)
 
     def _execute_script(self, script_path: str, name: str) -> bool:
         """Execute a script file.
@@ -297,55 +653,29 @@ class CommandStorage:
         Uses non-blocking execution to allow scripts that launch GUI applications
         or long-running processes to work properly.
         """
-        try:
-            script_file = Path(script_path)
-            if not script_file.exists():
-                logger.error(f"Script file does not exist: {script_path}")
-                if self._error_callback:
-                    self._error_callback(f"Error: Script file does not exist: {script_path}\n")
-                return False
+        if not _script_exists(script_path):
+            logger.error(f"Script file does not exist: {script_path}")
+            if self._error_callback:
+                self._error_callback(f"Error: Script file does not exist: {script_path}\n")
+            return False
 
-            logger.info(f"Executing script '{name}': {script_path}")
+        logger.info(f"Executing script '{name}': {script_path}")
+        return self._spawn("Script", name, str(Path(script_path)), f"$ {script_path}\n")
 
-            if self._output_callback:
-                self._output_callback(f"$ {script_path}\n")
-
-            # Use Popen to capture output
-            process = subprocess.Popen(
-                [str(script_file)],
-                shell=True,
-                stdin=subprocess.DEVNULL,
-                stdout=subprocess.PIPE if self._output_callback else None,
-                stderr=subprocess.PIPE if self._error_callback else None,
-                start_new_session=True,
-            )
-
-            # Start threads to read stdout and stderr
-            if self._output_callback and process.stdout:
-                stdout_thread = threading.Thread(
-                    target=self._read_stream,
-                    args=(process.stdout, self._output_callback),
-                    daemon=True,
-                )
-                stdout_thread.start()
 
-            if self._error_callback and process.stderr:
-                stderr_thread = threading.Thread(
-                    target=self._read_stream,
-                    args=(process.stderr, self._error_callback),
-                    daemon=True,
-                )
-                stderr_thread.start()
+# Storages with changes that may still need writing; weak so they can be freed once unused
+_open_storages: "weakref.WeakSet[CommandStorage]" = weakref.WeakSet()
 
-            logger.info(f"Script '{name}' started with PID {process.pid}")
-            return True
-        except Exception as e:
-            logger.error(f"Exception executing script '{name}': {e}")
-            if self._error_callback:
-                self._error_callback(f"Error: {e}\n")
-            return False
+
+@atexit.register
+def _flush_open_storages() -> None:
+    """Write the pending changes of every open storage before the interpreter exits."""
+    for storage in list(_open_storages):
+        storage.flush()
 
 
-def create_command_storage(storage_path: Optional[Path] = None) -> CommandStorage:
+def create_command_storage(
+    storage_path: Optional[Path] = None, inherit_output: Optional[bool] = None
+) -> CommandStorage:
     """Factory function to create a CommandStorage instance."""
-    return CommandStorage(storage_path)
+    return CommandStorage(storage_path, inherit_output)
@@ -1,9 +1,10 @@
 """Commands configuration dialog."""
 
+from types import MappingProxyType
 from typing import Optional
 
 from loguru import logger
-from PySide6.QtCore import Qt, Signal  # type: ignore
+from PySide6.QtCore import QSignalBlocker, Signal  # type: ignore
 from PySide6.QtGui import QFont  # type: ignore
 from PySide6.QtWidgets import (  # type: ignore
     QComboBox,
@@ -22,9 +23,22 @@ from PySide6.QtWidgets import (  # type: ignore
     QWidget,
 )
 
-from bashrunner.core.command_storage import Command
+from bashrunner.core.command_storage import Command, CommandStorage
 from bashrunner.core.storage_instance import command_storage
 
+# Command types and the labels shown for them in the type combo box, frozen so the
+# widgets can share them safely
+_TYPE_TO_DISPLAY = MappingProxyType(
+    {
+        "single": "Single Command",
+        "multi": "Multiple Commands",
+        "script": "Script File",
+    }
+)
+_DISPLAY_TO_TYPE = MappingProxyType(
+    {display: command_type for command_type, display in _TYPE_TO_DISPLAY.items()}
+)
+
 
 class AddEditCommandDialog(QDialog):
     """Dialog for adding or editing a command."""
@@ -55,7 +69,12 @@ class AddEditCommandDialog(QDialog):
 
         layout.addLayout(buttons_layout)
 
-        logger.info(f"{'Add' if command is None else 'Edit'} command dialog initialized")
+        logger.debug("Command dialog initialized")
+
+    def set_command(self, command: Optional[Command]) -> None:
+        """Reuse the dialog for another command, or for a new one if None."""
+        self.setWindowTitle("Add Command" if command is None else "Edit Command")
+        self.edit_widget.set_command(command)
 
     def get_command(self) -> Command:
         """Get the command from the edit widget."""
@@ -67,24 +86,17 @@ class CommandEditWidget(QWidget):
 
     def __init__(self, command: Optional[Command] = None, parent: Optional[QWidget] = None):
         super().__init__(parent)
-        self.command = command or Command("", "single", "", "")
 
         layout = QFormLayout(self)
 
         # Command name
-        self.name_edit = QLineEdit(self.command.name)
+        self.name_edit = QLineEdit()
         self.name_edit.setPlaceholderText("Command name (displayed on button)")
         layout.addRow("Name:", self.name_edit)
 
         # Command type
         self.type_combo = QComboBox()
-        self.type_combo.addItems(["Single Command", "Multiple Commands", "Script File"])
-        type_display = {
-            "single": "Single Command",
-            "multi": "Multiple Commands",
-            "script": "Script File",
-        }.get(self.command.command_type, "Single Command")
-        self.type_combo.setCurrentText(type_display)
+        self.type_combo.addItems(list(_TYPE_TO_DISPLAY.values()))
         self.type_combo.currentTextChanged.connect(self._on_type_changed)
         layout.addRow("Type:", self.type_combo)
 
@@ -93,7 +105,6 @@ class CommandEditWidget(QWidget):
         content_layout = QVBoxLayout(self.content_group)
 
         self.content_edit = QTextEdit()
-        self.content_edit.setPlainText(self.command.content)
         self.content_edit.setFont(QFont("Monospace", 10))
         content_layout.addWidget(self.content_edit)
 
@@ -101,13 +112,9 @@ class CommandEditWidget(QWidget):
         file_layout = QHBoxLayout()
         self.file_path_edit = QLineEdit()
         self.file_path_edit.setPlaceholderText("Script file path...")
-        if self.command.command_type == "script":
-            self.file_path_edit.setText(self.command.content)
-        self.file_path_edit.setVisible(self.command.command_type == "script")
 
         self.file_button = QPushButton("Browse...")
         self.file_button.clicked.connect(self._browse_file)
-        self.file_button.setVisible(self.command.command_type == "script")
 
         file_layout.addWidget(self.file_path_edit)
         file_layout.addWidget(self.file_button)
@@ -116,11 +123,24 @@ class CommandEditWidget(QWidget):
         layout.addRow(self.content_group)
 
         # Description
-        self.description_edit = QLineEdit(self.command.description)
+        self.description_edit = QLineEdit()
         self.description_edit.setPlaceholderText("Optional description")
         layout.addRow("Description:", self.description_edit)
 
-        # Initialize visibility
+        self.set_command(command)
+
+    def set_command(self, command: Optional[Command]) -> None:
+        """Load a command into the fields, or clear them for a new one if None."""
+        self.command = command or Command("", "single", "", "")
+        is_script = self.command.command_type == "script"
+
+        self.name_edit.setText(self.command.name)
+        self.type_combo.setCurrentText(
+            _TYPE_TO_DISPLAY.get(self.command.command_type, "Single Command")
+        )
+        self.content_edit.setPlainText(self.command.content)
+        self.file_path_edit.setText(self.command.content if is_script else "")
+        self.description_edit.setText(self.command.description)
         self._update_content_visibility()
 
     def _on_type_changed(self, text: str) -> None:
@@ -144,12 +164,7 @@ class CommandEditWidget(QWidget):
 
     def _get_command_type(self) -> str:
         """Get the current command type."""
-        type_map = {
-            "Single Command": "single",
-            "Multiple Commands": "multi",
-            "Script File": "script",
-        }
-        return type_map.get(self.type_combo.currentText(), "single")
+        return _DISPLAY_TO_TYPE.get(self.type_combo.currentText(), "single")
 
     def _browse_file(self) -> None:
         """Browse for script file."""
@@ -179,8 +194,9 @@ class CommandsConfigDialog(QDialog):
 
     commands_updated = Signal()
 
-    def __init__(self, parent: Optional[QWidget] = None):
+    def __init__(self, parent: Optional[QWidget] = None, storage: Optional[CommandStorage] = None):
         super().__init__(parent)
+        self._storage = storage if storage is not None else command_storage
         self.setWindowTitle("Commands Configuration")
         self.setMinimumSize(500, 600)
 
@@ -190,6 +206,8 @@ class CommandsConfigDialog(QDialog):
         list_group = QGroupBox("Commands")
         list_layout = QVBoxLayout(list_group)
 
+        self._command_dialog: Optional[AddEditCommandDialog] = None
+
         self.commands_list = QListWidget()
         self.commands_list.itemDoubleClicked.connect(self._edit_command)
         self.commands_list.currentRowChanged.connect(self._update_button_states)
@@ -233,24 +251,41 @@ class CommandsConfigDialog(QDialog):
 
         layout.addLayout(buttons_layout)
 
-        # Load commands
+        # Load commands; this also sets the initial button states
         self._load_commands()
-        self._update_button_states()
 
-        logger.info("Commands configuration dialog initialized")
+        logger.debug("Commands configuration dialog initialized")
 
     def _load_commands(self) -> None:
-        """Load commands into the list."""
-        self.commands_list.clear()
-        commands = command_storage.get_commands()
-
-        for i, command in enumerate(commands):
-            item = QListWidgetItem(command.name)
-            item.setData(Qt.ItemDataRole.UserRole, i)  # Store the index
-            self.commands_list.addItem(item)
-
+        """Fill the list from storage and select the first command."""
+        commands = self._storage.get_commands()
+        with QSignalBlocker(self.commands_list):
+            for command in commands:
+                self._append_list_item(command)
         if commands:
             self.commands_list.setCurrentRow(0)
+        self._update_button_states()
+
+    def _append_list_item(self, command: Command) -> None:
+        """Add a list item for a command appended to storage."""
+        # Rows mirror storage order, so the row is the command's index
+        self.commands_list.addItem(QListWidgetItem(command.name))
+
+    def _move_list_item(self, from_row: int, to_row: int) -> None:
+        """Move a list item to match a move already made in storage."""
+        with QSignalBlocker(self.commands_list):
+            item = self.commands_list.takeItem(from_row)
+            self.commands_list.insertItem(to_row, item)
+        self.commands_list.setCurrentRow(to_row)
+        self._update_button_states()
+
+    def _get_command_dialog(self, command: Optional[Command]) -> AddEditCommandDialog:
+        """Get the add/edit dialog for a command, reusing it across invocations."""
+        if self._command_dialog is None:
+            self._command_dialog = AddEditCommandDialog(command, self)
+        else:
+            self._command_dialog.set_command(command)
+        return self._command_dialog
 
     def _update_button_states(self) -> None:
         """Update button enabled states."""
@@ -265,7 +300,7 @@ class CommandsConfigDialog(QDialog):
 
     def _add_command(self) -> None:
         """Add a new command."""
-        dialog = AddEditCommandDialog(None, self)
+        dialog = self._get_command_dialog(None)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             command = dialog.get_command()
 
@@ -279,8 +314,9 @@ class CommandsConfigDialog(QDialog):
                 return
 
             # Add to storage
-            command_storage.add_command(command)
-            self._load_commands()
+            self._storage.add_command(command)
+            self._append_list_item(command)
+            self.commands_list.setCurrentRow(self.commands_list.count() - 1)
             self.commands_updated.emit()
 
             logger.info(f"Added new command: {command.name}")
@@ -291,12 +327,12 @@ class CommandsConfigDialog(QDialog):
         if current_row < 0:
             return
 
-        commands = command_storage.get_commands()
+        commands = self._storage.get_commands()
         if current_row >= len(commands):
             return
 
         command = commands[current_row]
-        dialog = AddEditCommandDialog(command, self)
+        dialog = self._get_command_dialog(command)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             edited_command = dialog.get_command()
 
@@ -310,8 +346,8 @@ class CommandsConfigDialog(QDialog):
                 return
 
             # Update in storage
-            command_storage.update_command(current_row, edited_command)
-            self._load_commands()
+            self._storage.update_command(current_row, edited_command)
+            self.commands_list.item(current_row).setText(edited_command.name)
             self.commands_updated.emit()
 
             logger.info(f"Updated command: {edited_command.name}")
@@ -331,8 +367,10 @@ class CommandsConfigDialog(QDialog):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            if command_storage.delete_command(current_row):
-                self._load_commands()
+            if self._storage.delete_command(current_row):
+                with QSignalBlocker(self.commands_list):
+                    self.commands_list.takeItem(current_row)
+                self._update_button_states()
                 self.commands_updated.emit()
                 logger.info("Deleted command")
 
@@ -340,16 +378,14 @@ class CommandsConfigDialog(QDialog):
         """Move the selected command up."""
         current_row = self.commands_list.currentRow()
         if current_row > 0:
-            if command_storage.move_command(current_row, current_row - 1):
-                self._load_commands()
-                self.commands_list.setCurrentRow(current_row - 1)
+            if self._storage.move_command(current_row, current_row - 1):
+                self._move_list_item(current_row, current_row - 1)
                 self.commands_updated.emit()
 
     def _move_command_down(self) -> None:
         """Move the selected command down."""
         current_row = self.commands_list.currentRow()
         if current_row < self.commands_list.count() - 1:
-            if command_storage.move_command(current_row, current_row + 1):
-                self._load_commands()
-                self.commands_list.setCurrentRow(current_row + 1)
+            if self._storage.move_command(current_row, current_row + 1):
+                self._move_list_item(current_row, current_row + 1)
                 self.commands_updated.emit()
@@ -1,10 +1,20 @@
 """Console view for displaying command output."""
 
 import re
+from typing import List
 
-from PySide6.QtCore import Slot  # type: ignore
-from PySide6.QtGui import QColor, QFont, QTextCharFormat, QTextCursor  # type: ignore
-from PySide6.QtWidgets import QTextEdit, QVBoxLayout, QWidget  # type: ignore
+from PySide6.QtCore import QTimer, Slot  # type: ignore
+from PySide6.QtGui import QFont, QTextCursor  # type: ignore
+from PySide6.QtWidgets import QPlainTextEdit, QVBoxLayout, QWidget  # type: ignore
+
+# Milliseconds output is buffered before being drawn
+_FLUSH_INTERVAL_MS = 20
+
+# Oldest lines are dropped beyond this, bounding memory for long-running commands
+_MAX_LINES = 10_000
+
+# ANSI color/formatting escape sequences
+_ANSI_RE = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
 
 
 class ConsoleView(QWidget):
@@ -15,70 +25,71 @@ class ConsoleView(QWidget):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
 
-        # Console text display
-        self.console_text = QTextEdit()
+        # Console text display; plain text uses a much cheaper line-based layout
+        self.console_text = QPlainTextEdit()
         self.console_text.setReadOnly(True)
         self.console_text.setFont(QFont("Monospace", 10))
-        self.console_text.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        self.console_text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        # Output is never edited, so keeping an undo step per insert is pure overhead
+        self.console_text.setUndoRedoEnabled(False)
+        self.console_text.setMaximumBlockCount(_MAX_LINES)
         self.console_text.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #000000;
                 color: #ffffff;
                 border: none;
             }
         """)
 
-        # Set default text color to white
-        cursor = self.console_text.textCursor()
-        format = cursor.charFormat()
-        format.setForeground(QColor("#ffffff"))
-        self.console_text.setCurrentCharFormat(format)
-
         layout.addWidget(self.console_text)
 
-    def _strip_ansi_codes(self, text: str) -> str:
+        # Output is buffered briefly so a burst of chunks is laid out once
+        self._pending: List[str] = []
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(_FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self._flush)
+
+    @staticmethod
+    def _strip_ansi_codes(text: str) -> str:
         """Strip ANSI color/formatting codes from text."""
-        ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-        return ansi_escape.sub("", text)
+        # Most output has no escape codes, and a single-character search is far cheaper
+        if "\x1b" not in text:
+            return text
+        return _ANSI_RE.sub("", text)
 
     @Slot(str)
     def append_output(self, text: str) -> None:
         """Append text to the console output."""
-        # Strip ANSI codes
-        clean_text = self._strip_ansi_codes(text)
-
-        # Move cursor to end
-        cursor = self.console_text.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-
-        # Create text format with white color
-        fmt = QTextCharFormat()
-        fmt.setForeground(QColor("#ffffff"))
-
-        # Insert text with white color
-        cursor.insertText(clean_text, fmt)
-        self.console_text.setTextCursor(cursor)
-        self.console_text.ensureCursorVisible()
+        self._queue(text)
 
     @Slot(str)
     def append_error(self, text: str) -> None:
-        """Append error text to the console output with red color."""
-        # Strip ANSI codes
-        clean_text = self._strip_ansi_codes(text)
-
-        # Move cursor to end
-        cursor = self.console_text.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-
-        # Use white color for error text as well
-        fmt = QTextCharFormat()
-        fmt.setForeground(QColor("#ffffff"))
-
-        # Insert text with red color
-        cursor.insertText(clean_text, fmt)
-        self.console_text.setTextCursor(cursor)
+        """Append error text to the console output."""
+        # Errors are shown in the same white as regular output
+        self._queue(text)
+
+    def _queue(self, text: str) -> None:
+        """Buffer text until the next flush."""
+        self._pending.append(text)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _flush(self) -> None:
+        """Draw all buffered output with a single insert."""
+        if not self._pending:
+            return
+        # Joining first also strips escape sequences split across chunks
+        clean_text = self._strip_ansi_codes("".join(self._pending))
+        self._pending.clear()
+
+        # Move the widget's own cursor to the end, rather than copying it out and back
+        self.console_text.moveCursor(QTextCursor.MoveOperation.End)
+        self.console_text.insertPlainText(clean_text)
         self.console_text.ensureCursorVisible()
 
     def clear(self) -> None:
-        """Clear the console output."""
+        """Clear the console output, including output not yet drawn."""
+        self._flush_timer.stop()
+        self._pending.clear()
         self.console_text.clear()
@@ -1,10 +1,13 @@
 """Main application window."""
 
-from typing import Optional
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Tuple
 
 from loguru import logger
-from PySide6.QtCore import Qt, Signal, Slot  # type: ignore
+from PySide6.QtCore import QMetaObject, Qt, Slot  # type: ignore
 from PySide6.QtWidgets import (  # type: ignore
+    QButtonGroup,
     QGridLayout,
     QHBoxLayout,
     QLabel,
@@ -17,27 +20,59 @@ from PySide6.QtWidgets import (  # type: ignore
     QWidget,
 )
 
-from bashrunner.core.command_storage import Command
+from bashrunner.core.command_storage import Command, CommandStorage
 from bashrunner.core.storage_instance import command_storage
+from bashrunner.gui.commands_config import CommandsConfigDialog
 from bashrunner.gui.console_view import ConsoleView
+from bashrunner.gui.settings_dialog import SettingsDialog
+
+# Style for the view tab buttons, applied once to the window and matched by property
+_TAB_STYLE = """
+    QPushButton[tab="true"] {
+        padding: 10px 20px;
+        border: 1px solid #ccc;
+        border-bottom: none;
+        background-color: #f0f0f0;
+        font-weight: bold;
+    }
+    QPushButton[tab="true"]:checked {
+        background-color: white;
+    }
+"""
+
+# Output chunks kept for the console until it is first opened, and queued between drains;
+# older ones are dropped, and the queue reports how many
+_CONSOLE_BACKLOG = 10_000
 
 
 class CommandButton(QPushButton):
     """Button that executes a command when clicked."""
 
-    def __init__(self, command: Command, index: int, parent: Optional[QWidget] = None):
-        super().__init__(command.name, parent)
-        self.command = command
-        self.index = index
+    def __init__(
+        self,
+        command: Command,
+        index: int,
+        parent: Optional[QWidget] = None,
+        storage: Optional[CommandStorage] = None,
+    ):
+        super().__init__(parent)
+        self._storage = storage if storage is not None else command_storage
+        self.set_command(command, index)
         self.clicked.connect(self._execute_command)
-        self.setToolTip(command.description or f"Execute: {command.content[:100]}...")
         self.setMinimumHeight(60)
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
 
+    def set_command(self, command: Command, index: int) -> None:
+        """Point the button at a command, so it can be reused when commands change."""
+        self.command = command
+        self.index = index
+        self.setText(command.name)
+        self.setToolTip(command.description or f"Execute: {command.content[:100]}...")
+
     def _execute_command(self) -> None:
         """Execute the associated command."""
         logger.info(f"Executing command: {self.command.name}")
-        success = command_storage.execute_command(self.index)
+        success = self._storage.execute_command(self.index)
         if success:
             logger.info(f"Command executed successfully: {self.command.name}")
         else:
@@ -47,13 +82,12 @@ class CommandButton(QPushButton):
 class MainWindow(QMainWindow):
     """Main application window."""
 
-    output_signal = Signal(str)
-    error_signal = Signal(str)
-
-    def __init__(self):
+    def __init__(self, storage: Optional[CommandStorage] = None):
         super().__init__()
+        self._storage = storage if storage is not None else command_storage
         self.setWindowTitle("BashRunner")
         self.setMinimumSize(800, 600)
+        self.setStyleSheet(_TAB_STYLE)
 
         # Central widget
         central_widget = QWidget()
@@ -70,41 +104,24 @@ class MainWindow(QMainWindow):
         self.main_tab_button = QPushButton("Commands")
         self.main_tab_button.setCheckable(True)
         self.main_tab_button.setChecked(True)
-        self.main_tab_button.clicked.connect(lambda: self._switch_view(0))
-        self.main_tab_button.setStyleSheet("""
-            QPushButton {
-                padding: 10px 20px;
-                border: 1px solid #ccc;
-                border-bottom: none;
-                background-color: #f0f0f0;
-                font-weight: bold;
-            }
-            QPushButton:checked {
-                background-color: white;
-            }
-        """)
+        self.main_tab_button.setProperty("tab", True)
         tab_layout.addWidget(self.main_tab_button)
 
         self.console_tab_button = QPushButton("Console")
         self.console_tab_button.setCheckable(True)
-        self.console_tab_button.clicked.connect(lambda: self._switch_view(1))
-        self.console_tab_button.setStyleSheet("""
-            QPushButton {
-                padding: 10px 20px;
-                border: 1px solid #ccc;
-                border-bottom: none;
-                background-color: #f0f0f0;
-                font-weight: bold;
-            }
-            QPushButton:checked {
-                background-color: white;
-            }
-        """)
+        self.console_tab_button.setProperty("tab", True)
         tab_layout.addWidget(self.console_tab_button)
 
         tab_layout.addStretch()
         layout.addLayout(tab_layout)
 
+        # The group keeps exactly one tab checked; button ids are the view indices
+        self._tab_group = QButtonGroup(self)
+        self._tab_group.setExclusive(True)
+        self._tab_group.addButton(self.main_tab_button, 0)
+        self._tab_group.addButton(self.console_tab_button, 1)
+        self._tab_group.idClicked.connect(self._switch_view)
+
         # Stacked widget for views
         self.stacked_widget = QStackedWidget()
         layout.addWidget(self.stacked_widget)
@@ -123,27 +140,33 @@ class MainWindow(QMainWindow):
         self.buttons_container = QWidget()
         self.buttons_layout = QGridLayout(self.buttons_container)
         self.buttons_layout.setSpacing(10)
+        self._buttons: List[CommandButton] = []
+        self._empty_label: Optional[QLabel] = None
+        self._columns = 0
+        self._buttons_dirty = False
 
         scroll_area.setWidget(self.buttons_container)
         main_view_layout.addWidget(scroll_area)
 
         self.stacked_widget.addWidget(main_view)
 
-        # Console view
-        self.console_view = ConsoleView()
-        self.stacked_widget.addWidget(self.console_view)
+        # Console view, created the first time it is shown. Until then output is
+        # kept as (is_error, text) chunks and a placeholder holds its place.
+        self.console_view: Optional[ConsoleView] = None
+        self._console_backlog: Deque[Tuple[bool, str]] = deque(maxlen=_CONSOLE_BACKLOG)
+        self._console_placeholder = QWidget()
+        self.stacked_widget.addWidget(self._console_placeholder)
 
-        # Connect signals with QueuedConnection for thread safety
-        self.output_signal.connect(
-            self.console_view.append_output, Qt.ConnectionType.QueuedConnection
-        )
-        self.error_signal.connect(
-            self.console_view.append_error, Qt.ConnectionType.QueuedConnection
-        )
+        # Output arrives on the IO thread as (is_error, text) chunks. They are queued
+        # under a lock and drained on the GUI thread, posting one event per batch.
+        self._out_lock = threading.Lock()
+        self._out_queue: Deque[Tuple[bool, str]] = deque(maxlen=_CONSOLE_BACKLOG)
+        self._out_dropped = 0
+        self._out_scheduled = False
 
         # Set up command storage callbacks
-        command_storage.set_output_callback(self._on_command_output)
-        command_storage.set_error_callback(self._on_command_error)
+        self._storage.set_output_callback(self._on_command_output)
+        self._storage.set_error_callback(self._on_command_error)
 
         # Bottom toolbar
         bottom_layout = QHBoxLayout()
@@ -163,76 +186,156 @@ class MainWindow(QMainWindow):
 
         layout.addLayout(bottom_layout)
 
+        # Dialogs are built on first use and reused afterwards
+        self._commands_dialog: Optional[CommandsConfigDialog] = None
+        self._settings_dialog: Optional[SettingsDialog] = None
+
         # Load initial commands
         self._refresh_buttons()
 
-        logger.info("Main window initialized")
+        logger.debug("Main window initialized")
 
     def _switch_view(self, index: int) -> None:
         """Switch between main view and console view."""
+        if index == 1:
+            self._ensure_console_view()
+        elif self._buttons_dirty:
+            self._refresh_buttons()
         self.stacked_widget.setCurrentIndex(index)
-        self.main_tab_button.setChecked(index == 0)
-        self.console_tab_button.setChecked(index == 1)
+        self._tab_group.button(index).setChecked(True)
+
+    def _ensure_console_view(self) -> ConsoleView:
+        """Create the console view, replaying the output received before it existed."""
+        if self.console_view is None:
+            self.console_view = ConsoleView()
+            self.stacked_widget.removeWidget(self._console_placeholder)
+            self._console_placeholder.deleteLater()
+            self.stacked_widget.insertWidget(1, self.console_view)
+
+            for is_error, text in self._console_backlog:
+                if is_error:
+                    self.console_view.append_error(text)
+                else:
+                    self.console_view.append_output(text)
+            self._console_backlog.clear()
+        return self.console_view
 
-    @Slot(str)
     def _on_command_output(self, text: str) -> None:
         """Handle command output."""
-        self.output_signal.emit(text)
+        self._queue_output(False, text)
 
-    @Slot(str)
     def _on_command_error(self, text: str) -> None:
         """Handle command error output."""
-        self.error_signal.emit(text)
+        self._queue_output(True, text)
+
+    def _queue_output(self, is_error: bool, text: str) -> None:
+        """Queue output from any thread, scheduling a drain on the GUI thread if needed."""
+        with self._out_lock:
+            # A full queue drops its oldest chunk; count it so the console can say so
+            if len(self._out_queue) == self._out_queue.maxlen:
+                self._out_dropped += 1
+            self._out_queue.append((is_error, text))
+            if self._out_scheduled:
+                return
+            self._out_scheduled = True
+        QMetaObject.invokeMethod(self, "_drain_output", Qt.ConnectionType.QueuedConnection)
+
+    @Slot()
+    def _drain_output(self) -> None:
+        """Hand the queued output to the console, joining consecutive chunks of one kind."""
+        with self._out_lock:
+            chunks = list(self._out_queue)
+            self._out_queue.clear()
+            dropped, self._out_dropped = self._out_dropped, 0
+            self._out_scheduled = False
+
+        if dropped:
+            chunks.insert(0, (True, f"[… {dropped} chunks dropped]\n"))
+
+        runs: List[Tuple[bool, List[str]]] = []
+        for is_error, text in chunks:
+            if runs and runs[-1][0] == is_error:
+                runs[-1][1].append(text)
+            else:
+                runs.append((is_error, [text]))
+
+        for is_error, texts in runs:
+            text = "".join(texts)
+            if self.console_view is None:
+                self._console_backlog.append((is_error, text))
+            elif is_error:
+                self.console_view.append_error(text)
+            else:
+                self.console_view.append_output(text)
+
+    def _request_button_refresh(self) -> None:
+        """Refresh the buttons now if they are visible, otherwise when next shown."""
+        self._buttons_dirty = True
+        if self.stacked_widget.currentIndex() == 0:
+            self._refresh_buttons()
 
     def _refresh_buttons(self) -> None:
-        """Refresh the button grid based on current commands."""
-        # Clear existing buttons
-        while self.buttons_layout.count():
-            child = self.buttons_layout.takeAt(0)
-            widget = child.widget()
-            if widget is not None:
-                widget.deleteLater()
-
-        commands = command_storage.get_commands()
-
-        if not commands:
-            # Show empty state
-            empty_label = QLabel("No commands configured.\nClick 'Commands' to add some.")
-            empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            empty_label.setStyleSheet("font-size: 16px; color: #666; padding: 40px;")
-            self.buttons_layout.addWidget(empty_label, 0, 0)
-        else:
-            # Create buttons in a grid layout
-            columns = min(4, len(commands))  # Max 4 columns
-            if columns == 0:
-                columns = 1
+        """Sync the button grid with the current commands, reusing existing buttons."""
+        self._buttons_dirty = False
+        commands = self._storage.get_commands()
+        buttons = self._buttons
+
+        # Suspend repaints and layout passes until every change is in
+        self.buttons_container.setUpdatesEnabled(False)
+        self.buttons_layout.setEnabled(False)
+        try:
+            # Drop the buttons of removed commands
+            while len(buttons) > len(commands):
+                button = buttons.pop()
+                self.buttons_layout.removeWidget(button)
+                button.deleteLater()
+
+            # Grid positions only move when the column count changes
+            columns = max(1, min(4, len(commands)))  # Max 4 columns
+            relayout = columns != self._columns
+            self._columns = columns
 
             for i, command in enumerate(commands):
-                row = i // columns
-                col = i % columns
-
-                button = CommandButton(command, i, self.buttons_container)
-                self.buttons_layout.addWidget(button, row, col)
-
-        # Update container size
-        self.buttons_container.adjustSize()
+                if i < len(buttons):
+                    button = buttons[i]
+                    if button.command is not command or button.index != i:
+                        button.set_command(command, i)
+                    if not relayout:
+                        continue
+                    self.buttons_layout.removeWidget(button)
+                else:
+                    button = CommandButton(command, i, self.buttons_container, self._storage)
+                    buttons.append(button)
+                self.buttons_layout.addWidget(button, i // columns, i % columns)
+
+            if not commands and self._empty_label is None:
+                # Show empty state
+                self._empty_label = QLabel("No commands configured.\nClick 'Commands' to add some.")
+                self._empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                self._empty_label.setStyleSheet("font-size: 16px; color: #666; padding: 40px;")
+                self.buttons_layout.addWidget(self._empty_label, 0, 0)
+            elif commands and self._empty_label is not None:
+                self.buttons_layout.removeWidget(self._empty_label)
+                self._empty_label.deleteLater()
+                self._empty_label = None
+        finally:
+            self.buttons_layout.setEnabled(True)
+            self.buttons_container.setUpdatesEnabled(True)
 
         logger.info(f"Refreshed buttons: {len(commands)} commands displayed")
 
     def _show_commands_config(self) -> None:
         """Show the commands configuration dialog."""
-        from bashrunner.gui.commands_config import CommandsConfigDialog
-
-        dialog = CommandsConfigDialog(self)
-        dialog.commands_updated.connect(self._refresh_buttons)
-        dialog.exec()
+        if self._commands_dialog is None:
+            self._commands_dialog = CommandsConfigDialog(self, self._storage)
+            self._commands_dialog.commands_updated.connect(self._request_button_refresh)
+        self._commands_dialog.exec()
 
     def _show_settings(self) -> None:
         """Show the settings dialog."""
-        from bashrunner.gui.settings_dialog import SettingsDialog
-
-        dialog = SettingsDialog(self)
-        if dialog.exec():
-            settings = dialog.get_settings()
+        if self._settings_dialog is None:
+            self._settings_dialog = SettingsDialog(self)
+        if self._settings_dialog.exec():
+            settings = self._settings_dialog.get_settings()
             logger.info(f"Settings updated: {settings}")
-            self._refresh_buttons()
+            self._request_button_refresh()
@@ -60,7 +60,10 @@ class SettingsDialog(QDialog):
 
         layout.addLayout(buttons_layout)
 
-        logger.info("Settings dialog initialized")
+        # The dialog is reused, so cancelled edits are undone back to these settings
+        self._accepted_settings = self.get_settings()
+
+        logger.debug("Settings dialog initialized")
 
     def get_settings(self) -> Dict[str, Any]:
         """Get current settings as a dictionary."""
@@ -68,3 +71,18 @@ class SettingsDialog(QDialog):
             "auto_refresh": self.auto_refresh_checkbox.isChecked(),
             "grid_columns": self.columns_spinbox.value(),
         }
+
+    def set_settings(self, settings: Dict[str, Any]) -> None:
+        """Show the given settings in the dialog's widgets."""
+        self.auto_refresh_checkbox.setChecked(settings["auto_refresh"])
+        self.columns_spinbox.setValue(settings["grid_columns"])
+
+    def accept(self) -> None:
+        """Keep the shown settings as the ones to return to on a later cancel."""
+        self._accepted_settings = self.get_settings()
+        super().accept()
+
+    def reject(self) -> None:
+        """Discard the edits made since the dialog was last accepted."""
+        self.set_settings(self._accepted_settings)
+        super().reject()
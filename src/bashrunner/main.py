@@ -8,16 +8,36 @@ from PySide6.QtWidgets import QApplication
 
 from bashrunner.gui.main_window import MainWindow
 
+# Log formats for terminals and for redirected output
+_LOG_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
+_PLAIN_LOG_FORMAT = (
+    "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+)
+
+_logging_configured = False
+
+
+def _configure_logging() -> None:
+    """Install the stderr log sink, once per process."""
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+
+    # Colour markup is only parsed when a terminal will show it
+    logger.remove()
+    if sys.stderr.isatty():
+        logger.add(sys.stderr, format=_LOG_FORMAT, level="INFO")
+    else:
+        logger.add(sys.stderr, format=_PLAIN_LOG_FORMAT, level="INFO", colorize=False)
+
 
 def main():
     """Main application entry point."""
-    # Configure logger
-    logger.remove()
-    logger.add(
-        sys.stderr,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-        level="INFO",
-    )
+    _configure_logging()
 
     # Create application
     app = QApplication(sys.argv)
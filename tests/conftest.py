@@ -0,0 +1,55 @@
+"""Shared fixtures for BashRunner tests."""
+
+from typing import Dict
+
+import pytest
+from PySide6.QtWidgets import QMessageBox  # type: ignore
+
+from bashrunner.core.command_storage import Command, CommandStorage
+
+
+@pytest.fixture
+def temp_storage(tmp_path, monkeypatch):
+    """Create a temporary storage for testing.
+
+    Saves are dropped rather than written and synced to disk; persistence itself
+    is covered by the storage unit tests.
+    """
+    storage = CommandStorage(tmp_path)
+    monkeypatch.setattr(storage, "_save_commands", lambda commands: None)
+    yield storage
+    storage.flush()
+
+
+@pytest.fixture
+def storage_with(temp_storage):
+    """Return a function that seeds temp_storage with commands in a single batch."""
+
+    def seed(*commands: Command) -> CommandStorage:
+        with temp_storage.batch():
+            for command in commands:
+                temp_storage.add_command(command)
+        return temp_storage
+
+    return seed
+
+
+@pytest.fixture(autouse=True)
+def mock_dialogs(monkeypatch) -> Dict[str, int]:
+    """Replace modal message boxes, counting how often each kind is shown.
+
+    Questions are answered with Yes.
+    """
+    calls = {"warning": 0, "information": 0, "question": 0}
+
+    def shown(kind, result=None):
+        def show(*args, **kwargs):
+            calls[kind] += 1
+            return result
+
+        return show
+
+    monkeypatch.setattr(QMessageBox, "warning", shown("warning"))
+    monkeypatch.setattr(QMessageBox, "information", shown("information"))
+    monkeypatch.setattr(QMessageBox, "question", shown("question", QMessageBox.StandardButton.Yes))
+    return calls
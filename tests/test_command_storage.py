@@ -1,24 +1,30 @@
 """Unit tests for command storage module."""
 
-import tempfile
-from pathlib import Path
+import dataclasses
+import gc
+import os
+import threading
+import time
+import weakref
 
 import pytest
 
+import bashrunner.core.command_storage as storage_module
 from bashrunner.core.command_storage import Command, CommandStorage
 
 
 @pytest.fixture
-def temp_storage_path():
+def temp_storage_path(tmp_path):
     """Create a temporary storage path for testing."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        yield Path(tmpdir)
+    return tmp_path
 
 
 @pytest.fixture
 def storage(temp_storage_path):
     """Create a CommandStorage instance with temporary path."""
-    return CommandStorage(temp_storage_path)
+    storage = CommandStorage(temp_storage_path)
+    yield storage
+    storage.flush()
 
 
 def test_command_creation():
@@ -57,12 +63,28 @@ def test_command_from_dict():
     assert cmd.description == "Test description"
 
 
+def test_command_is_immutable():
+    """Test that a Command cannot be modified in place."""
+    cmd = Command("Test", "single", "echo hello")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cmd.name = "Changed"  # type: ignore[misc]
+
+
+def test_command_from_dict_interns_type():
+    """Test that commands loaded from dictionaries share their type strings."""
+    first = Command.from_dict({"name": "A", "command_type": "".join(["sc", "ript"]), "content": ""})
+    second = Command.from_dict(
+        {"name": "B", "command_type": "".join(["sc", "ript"]), "content": ""}
+    )
+    assert first.command_type is second.command_type
+
+
 def test_storage_initialization(temp_storage_path):
     """Test CommandStorage initialization."""
     storage = CommandStorage(temp_storage_path)
     assert storage.storage_path == temp_storage_path
     assert storage.commands_file == temp_storage_path / "commands.json"
-    assert storage.get_commands() == []
+    assert storage.get_commands() == ()
 
 
 def test_add_command(storage):
@@ -74,16 +96,20 @@ def test_add_command(storage):
     assert commands[0].name == "Test"
 
 
-def test_get_commands_returns_copy(storage):
-    """Test that get_commands returns a copy, not the original list."""
-    cmd = Command("Test", "single", "echo hello", "")
-    storage.add_command(cmd)
+def test_get_commands_returns_shared_snapshot(storage):
+    """Test that get_commands returns an immutable snapshot, reused until a change."""
+    storage.add_command(Command("Test", "single", "echo hello", ""))
 
     commands1 = storage.get_commands()
     commands2 = storage.get_commands()
 
-    assert commands1 is not commands2
-    assert commands1 == commands2
+    assert isinstance(commands1, tuple)
+    assert commands1 is commands2
+
+    storage.add_command(Command("Other", "single", "echo other", ""))
+
+    assert len(commands1) == 1
+    assert len(storage.get_commands()) == 2
 
 
 def test_update_command(storage):
@@ -160,6 +186,16 @@ def test_move_command(storage):
     assert commands[2].name == "Test1"
 
 
+def test_move_command_adjacent(storage):
+    """Test moving a command by one position."""
+    for i in range(3):
+        storage.add_command(Command(f"Test{i}", "single", f"echo {i}", ""))
+
+    assert storage.move_command(2, 1) is True
+
+    assert [cmd.name for cmd in storage.get_commands()] == ["Test0", "Test2", "Test1"]
+
+
 def test_move_command_invalid_indices(storage):
     """Test moving with invalid indices."""
     cmd = Command("Test", "single", "echo hello", "")
@@ -170,11 +206,41 @@ def test_move_command_invalid_indices(storage):
     assert result is False
 
 
+def test_get_index_by_name(storage):
+    """Test looking up command indices by name as the list changes."""
+    for name in ["First", "Second", "Third"]:
+        storage.add_command(Command(name, "single", "echo", ""))
+
+    assert storage.get_index("Third") == 2
+    assert storage.get_index("Missing") is None
+
+    storage.move_command(2, 0)
+    assert storage.get_index("Third") == 0
+
+    storage.delete_command(0)
+    assert storage.get_index("Third") is None
+    assert storage.get_index("First") == 0
+
+
+def test_get_by_name(storage):
+    """Test looking up commands by name, including after an update renames one."""
+    storage.add_command(Command("First", "single", "echo 1", ""))
+    storage.add_command(Command("Second", "single", "echo 2", ""))
+
+    assert storage.get_by_name("Second") == Command("Second", "single", "echo 2", "")
+    assert storage.get_by_name("Missing") is None
+
+    storage.update_command(1, Command("Renamed", "single", "echo 2", ""))
+    assert storage.get_by_name("Second") is None
+    assert storage.get_by_name("Renamed").content == "echo 2"
+
+
 def test_persistence(temp_storage_path):
     """Test that commands are persisted to disk."""
     storage1 = CommandStorage(temp_storage_path)
     cmd = Command("Test", "single", "echo hello", "")
     storage1.add_command(cmd)
+    storage1.flush()
 
     # Create new storage instance with same path
     storage2 = CommandStorage(temp_storage_path)
@@ -185,13 +251,184 @@ def test_persistence(temp_storage_path):
     assert commands[0].content == "echo hello"
 
 
+def test_saves_are_coalesced_until_flush(temp_storage_path):
+    """Test that a burst of mutations is written to disk once, atomically."""
+    storage = CommandStorage(temp_storage_path)
+    for i in range(3):
+        storage.add_command(Command(f"Test{i}", "single", f"echo {i}", ""))
+
+    assert not storage.commands_file.exists()
+
+    storage.flush()
+
+    assert storage.commands_file.exists()
+    assert not (temp_storage_path / "commands.json.tmp").exists()
+    assert len(CommandStorage(temp_storage_path).get_commands()) == 3
+
+
+def test_saves_happen_in_background(temp_storage_path, monkeypatch):
+    """Test that pending changes are written without an explicit flush."""
+    monkeypatch.setattr(storage_module, "_SAVE_DELAY", 0)
+    storage = CommandStorage(temp_storage_path)
+    storage.add_command(Command("Test", "single", "echo test", ""))
+
+    deadline = time.monotonic() + 5
+    while not storage.commands_file.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert storage.commands_file.exists()
+    storage.flush()
+    assert len(CommandStorage(temp_storage_path).get_commands()) == 1
+
+
+def test_exit_hook_flushes_open_storages(temp_storage_path):
+    """Test that pending changes are written at exit until the storage is closed."""
+    storage = CommandStorage(temp_storage_path)
+    storage.add_command(Command("Test", "single", "echo test", ""))
+
+    storage_module._flush_open_storages()
+
+    assert len(CommandStorage(temp_storage_path).get_commands()) == 1
+
+    storage.close()
+
+    assert storage not in storage_module._open_storages
+
+
+def test_saved_storage_can_be_freed(temp_storage_path, monkeypatch):
+    """Test that neither the exit hook nor an idle writer keeps a storage alive."""
+    monkeypatch.setattr(storage_module, "_SAVE_DELAY", 0)
+    storage = CommandStorage(temp_storage_path)
+    storage.add_command(Command("Test", "single", "echo test", ""))
+    writer = storage._writer
+    assert writer is not None
+
+    # The writer stops by itself once the change is saved
+    writer.join(5)
+
+    assert not writer.is_alive()
+    ref = weakref.ref(storage)
+    del storage
+    gc.collect()
+
+    assert ref() is None
+
+
+def test_batch_defers_save_until_exit(storage):
+    """Test that mutations inside a batch are queued once, when it exits."""
+    with storage.batch():
+        storage.add_command(Command("First", "single", "echo 1", ""))
+        with storage.batch():
+            storage.add_command(Command("Second", "single", "echo 2", ""))
+        storage.move_command(0, 1)
+        storage.flush()
+        assert not storage.commands_file.exists()
+
+    storage.flush()
+
+    names = [cmd.name for cmd in CommandStorage(storage.storage_path).get_commands()]
+    assert names == ["Second", "First"]
+
+
+def test_unchanged_commands_are_not_rewritten(storage):
+    """Test that a flush whose contents match the last save skips the write."""
+    storage.add_command(Command("Test", "single", "echo hello", ""))
+    storage.flush()
+    inode = storage.commands_file.stat().st_ino
+
+    storage.update_command(0, Command("Test", "single", "echo hello", ""))
+    storage.flush()
+
+    assert storage.commands_file.stat().st_ino == inode
+
+
+def test_saved_file_is_compact_unless_pretty(storage, monkeypatch):
+    """Test that commands are written compactly unless pretty output is enabled."""
+    storage.add_command(Command("Test", "single", "echo test", ""))
+    storage.flush()
+    assert "\n" not in storage.commands_file.read_text()
+
+    monkeypatch.setattr(storage_module, "_PRETTY_JSON", True)
+    storage.add_command(Command("Other", "single", "echo other", ""))
+    storage.flush()
+    assert '\n  "commands"' in storage.commands_file.read_text()
+
+
+def test_persistence_without_orjson(temp_storage_path, monkeypatch):
+    """Test that commands round-trip through the stdlib json fallback."""
+    monkeypatch.setattr(storage_module, "orjson", None)
+    storage = CommandStorage(temp_storage_path)
+    storage.add_command(Command("Ünïcode", "single", "echo héllo", "Description"))
+    storage.flush()
+
+    commands = CommandStorage(temp_storage_path).get_commands()
+
+    assert commands == (Command("Ünïcode", "single", "echo héllo", "Description"),)
+
+
+def test_load_streams_large_files(temp_storage_path, monkeypatch):
+    """Test that large commands files load through the streaming parser."""
+    pytest.importorskip("ijson")
+    storage = CommandStorage(temp_storage_path)
+    storage.add_command(Command("Test", "single", "echo hello", "Description"))
+    storage.flush()
+
+    monkeypatch.setattr(storage_module, "_STREAM_THRESHOLD", 0)
+    commands = CommandStorage(temp_storage_path).get_commands()
+
+    assert commands == (Command("Test", "single", "echo hello", "Description"),)
+
+
+def test_load_memory_maps_large_files(temp_storage_path, monkeypatch):
+    """Test that large commands files load through a memory map."""
+    pytest.importorskip("orjson")
+    storage = CommandStorage(temp_storage_path)
+    storage.add_command(Command("Test", "single", "echo hello", "Description"))
+    storage.flush()
+
+    monkeypatch.setattr(storage_module, "ijson", None)
+    monkeypatch.setattr(storage_module, "_MMAP_THRESHOLD", 0)
+    commands = CommandStorage(temp_storage_path).get_commands()
+
+    assert commands == (Command("Test", "single", "echo hello", "Description"),)
+
+
+def test_load_falls_back_when_mmap_fails(temp_storage_path, monkeypatch):
+    """Test that files which cannot be memory-mapped are read normally."""
+    pytest.importorskip("orjson")
+    storage = CommandStorage(temp_storage_path)
+    storage.add_command(Command("Test", "single", "echo hello", "Description"))
+    storage.flush()
+
+    def fail_mmap(*args, **kwargs):
+        raise ValueError("cannot mmap")
+
+    monkeypatch.setattr(storage_module, "ijson", None)
+    monkeypatch.setattr(storage_module, "_MMAP_THRESHOLD", 0)
+    monkeypatch.setattr(storage_module.mmap, "mmap", fail_mmap)
+    commands = CommandStorage(temp_storage_path).get_commands()
+
+    assert commands == (Command("Test", "single", "echo hello", "Description"),)
+
+
+def test_load_is_deferred_until_first_use(temp_storage_path):
+    """Test that the commands file is not read until the commands are needed."""
+    storage = CommandStorage(temp_storage_path)
+    source = CommandStorage(temp_storage_path / "source")
+    source.add_command(Command("Test", "single", "echo hello", ""))
+    source.flush()
+    (temp_storage_path / "source" / "commands.json").replace(storage.commands_file)
+
+    assert storage.get_commands() == (Command("Test", "single", "echo hello", ""),)
+
+
 def test_load_corrupted_file(temp_storage_path):
     """Test loading from a corrupted JSON file."""
     commands_file = temp_storage_path / "commands.json"
     commands_file.write_text("invalid json{")
 
     storage = CommandStorage(temp_storage_path)
-    assert storage.get_commands() == []
+    assert storage.get_commands() == ()
 
 
 def test_execute_single_command(storage):
@@ -203,6 +440,224 @@ def test_execute_single_command(storage):
     assert result is True
 
 
+def test_execute_streams_decoded_output(storage):
+    """Test that output reaches the callback as text, undecodable bytes replaced."""
+    lines = []
+    storage.set_output_callback(lines.append)
+    storage.add_command(Command("Printf", "single", "printf 'caf\\303\\251\\n\\377\\n'", ""))
+
+    assert storage.execute_command(0) is True
+
+    deadline = time.monotonic() + 5
+    while "".join(lines).count("\n") < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # Both lines arrive in one write, and are delivered in one callback
+    assert lines[1:] == ["café\n\ufffd\n"]
+
+
+def test_execute_streams_share_one_io_thread(storage):
+    """Test that several commands' stdout and stderr are read by a single thread."""
+    output, errors = [], []
+    storage.set_output_callback(output.append)
+    storage.set_error_callback(errors.append)
+    storage.add_command(Command("Out", "single", "printf 'no newline'", ""))
+    storage.add_command(Command("Err", "multi", "echo oops >&2", ""))
+
+    threads_before = threading.active_count()
+    assert storage.execute_command(0) is True
+    assert storage.execute_command(1) is True
+
+    deadline = time.monotonic() + 5
+    while (len(output) < 3 or not errors) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert "no newline" in output
+    assert errors == ["oops\n"]
+    assert threading.active_count() <= threads_before + 1
+
+
+def test_execute_streams_without_selectable_pipes(storage, monkeypatch):
+    """Test that pipes are read by per-stream threads where they can't be selected on."""
+    monkeypatch.setattr(storage_module, "_SELECT_PIPES", False)
+    monkeypatch.setattr(
+        storage_module.os, "set_blocking", lambda fd, blocking: pytest.fail("set_blocking")
+    )
+    output, errors = [], []
+    storage.set_output_callback(output.append)
+    storage.set_error_callback(errors.append)
+    storage.add_command(Command("Both", "multi", "echo out\necho err >&2", ""))
+
+    assert storage.execute_command(0) is True
+
+    deadline = time.monotonic() + 5
+    while (len(output) < 2 or not errors) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert output[1:] == ["out\n"]
+    assert errors == ["err\n"]
+    assert storage._io_selector is None
+
+
+@pytest.mark.parametrize(
+    "command, argv",
+    [
+        ("ls -la /tmp", ["ls", "-la", "/tmp"]),
+        ("grep 'two words' \"a file\"", ["grep", "two words", "a file"]),
+        ("FOO=bar env", None),
+        ("ls ~", None),
+        ("ls # comment", None),
+        ("ls 'unterminated", None),
+        ("echo 'a\\tb'", None),
+        ("cd /", None),
+        ("test -d /", None),
+        ("pwd", None),
+        ("", None),
+    ],
+)
+def test_split_simple_command(command, argv):
+    """Test which commands are split for direct exec and which need a shell."""
+    assert storage_module._split_simple_command(command) == argv
+
+
+@pytest.fixture
+def popen_args(monkeypatch):
+    """Record the first argument of every Popen call."""
+    calls = []
+    popen = storage_module.subprocess.Popen
+
+    def recording_popen(args, **kwargs):
+        calls.append(args)
+        return popen(args, **kwargs)
+
+    monkeypatch.setattr(storage_module.subprocess, "Popen", recording_popen)
+    return calls
+
+
+def test_execute_simple_command_directly(storage, popen_args):
+    """Test that a simple command is exec'd without a shell, and its output streamed."""
+    output = []
+    storage.set_output_callback(output.append)
+    storage.add_command(Command("List", "single", "ls -d /", ""))
+
+    assert storage.execute_command(0) is True
+
+    deadline = time.monotonic() + 5
+    while len(output) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert popen_args == [["ls", "-d", "/"]]
+    assert output == ["$ ls -d /\n", "/\n"]
+
+
+def test_execute_without_posix_shell_uses_shell(storage, popen_args, monkeypatch):
+    """Test that commands go to the shell unchanged where POSIX splitting doesn't apply."""
+    monkeypatch.setattr(storage_module, "_EXEC_DIRECT", False)
+    storage.add_command(Command("Open", "single", "ls C:\\dir\\f.txt", ""))
+
+    assert storage_module._split_simple_command("ls -d /") is None
+    assert storage.execute_command(0) is True
+    assert popen_args == ["ls C:\\dir\\f.txt"]
+
+
+def test_execute_path_skips_lookup(storage, popen_args, monkeypatch):
+    """Test that a program given as a path is exec'd as is, without a PATH lookup."""
+    monkeypatch.setattr(
+        storage_module, "_resolve_executable", lambda *args: pytest.fail("looked up on PATH")
+    )
+    storage.add_command(Command("List", "single", "/bin/ls -d /", ""))
+
+    assert storage.execute_command(0) is True
+    assert popen_args == [["/bin/ls", "-d", "/"]]
+
+
+def test_execute_removed_program_forgets_cached_path(storage, popen_args, monkeypatch, tmp_path):
+    """Test that a program removed after it was resolved falls back to the shell, once."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    program = bin_dir / "bashrunner-test-tool"
+    program.write_text("#!/bin/sh\n")
+    program.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    storage.add_command(Command("Tool", "single", "bashrunner-test-tool", ""))
+
+    assert storage.execute_command(0) is True
+    program.unlink()
+    assert storage.execute_command(0) is True
+    assert storage.execute_command(0) is True
+
+    # The stale path fails once, after which the shell is used straight away
+    assert popen_args == [
+        ["bashrunner-test-tool"],
+        ["bashrunner-test-tool"],
+        "bashrunner-test-tool",
+        "bashrunner-test-tool",
+    ]
+
+
+def test_execute_script_without_shebang(storage, popen_args, monkeypatch, tmp_path):
+    """Test that an executable the kernel can't exec is run by the shell instead."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    program = bin_dir / "bashrunner-test-script"
+    program.write_text("echo from script\n")
+    program.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    output = []
+    storage.set_output_callback(output.append)
+    storage.add_command(Command("Script", "single", "bashrunner-test-script", ""))
+
+    assert storage.execute_command(0) is True
+
+    deadline = time.monotonic() + 5
+    while len(output) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert popen_args == [["bashrunner-test-script"], "bashrunner-test-script"]
+    assert output == ["$ bashrunner-test-script\n", "from script\n"]
+
+
+def test_execute_builtin_uses_shell(storage, popen_args):
+    """Test that builtins run in the shell even when a program of that name is on PATH."""
+    storage.add_command(Command("Echo", "single", 'echo "a\\tb"', ""))
+
+    assert storage.execute_command(0) is True
+    assert popen_args == ['echo "a\\tb"']
+
+
+def test_execute_unresolved_command_uses_shell(storage):
+    """Test that a command whose program isn't on PATH is still run, by the shell."""
+    errors = []
+    storage.set_error_callback(errors.append)
+    storage.add_command(Command("Missing", "single", "no-such-program-xyz", ""))
+
+    assert storage.execute_command(0) is True
+
+    deadline = time.monotonic() + 5
+    while not errors and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert "no-such-program-xyz" in "".join(errors)
+
+
+def test_execute_shell_syntax_commands(storage):
+    """Test executing single commands that need a shell: builtins and pipes."""
+    output = []
+    storage.set_output_callback(output.append)
+    storage.add_command(Command("Builtin", "single", "cd / && pwd", ""))
+    storage.add_command(Command("Pipe", "single", "echo test | tr a-z A-Z", ""))
+
+    assert storage.execute_command(0) is True
+    assert storage.execute_command(1) is True
+
+    deadline = time.monotonic() + 5
+    while len(output) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert "/\n" in output
+    assert "TEST\n" in output
+
+
 def test_execute_multi_commands(storage):
     """Test executing multiple commands."""
     cmd = Command("Multi", "multi", "echo line1\necho line2", "")
@@ -212,6 +667,23 @@ def test_execute_multi_commands(storage):
     assert result is True
 
 
+def test_execute_multi_commands_echoes_each_line(storage):
+    """Test that each non-blank line of a multi command is echoed once."""
+    output = []
+    storage.set_output_callback(output.append)
+    storage.add_command(Command("Multi", "multi", "  true\r\n\n\ttrue  \n", ""))
+
+    assert storage.execute_command(0) is True
+    assert output[0] == "$ true\n$ true\n"
+
+
+def test_execute_multi_commands_blank(storage):
+    """Test that a multi command with only blank lines is not executed."""
+    storage.add_command(Command("Blank", "multi", "\n  \n", ""))
+
+    assert storage.execute_command(0) is False
+
+
 def test_execute_failing_command(storage):
     """Test that commands launch successfully even if they eventually fail.
 
@@ -226,6 +698,32 @@ def test_execute_failing_command(storage):
     assert result is True
 
 
+@pytest.mark.parametrize("inherit_output", [True, False])
+def test_execute_command_output_inheritance(temp_storage_path, capfd, inherit_output):
+    """Test that output without a callback reaches fd 1 only when it is inherited."""
+    done = temp_storage_path / "done"
+    storage = CommandStorage(temp_storage_path, inherit_output=inherit_output)
+    storage.add_command(Command("Echo", "multi", f"echo test\ntouch '{done}'", ""))
+
+    assert storage.execute_command(0) is True
+
+    deadline = time.monotonic() + 5
+    while not done.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert done.exists()
+    assert ("test\n" in capfd.readouterr().out) is inherit_output
+    storage.flush()
+
+
+def test_inherit_output_follows_environment(temp_storage_path, monkeypatch):
+    """Test that BASHRUNNER_DISCARD_OUTPUT sets the default, and an argument overrides it."""
+    monkeypatch.setattr(storage_module, "_INHERIT_OUTPUT", False)
+    assert CommandStorage(temp_storage_path).inherit_output is False
+    assert CommandStorage(temp_storage_path, inherit_output=True).inherit_output is True
+    assert storage_module.create_command_storage(temp_storage_path).inherit_output is False
+
+
 def test_execute_nonexistent_script(storage):
     """Test executing a nonexistent script."""
     cmd = Command("Script", "script", "/nonexistent/script.sh", "")
@@ -235,6 +733,25 @@ def test_execute_nonexistent_script(storage):
     assert result is False
 
 
+def test_execute_script_created_after_failed_run(storage, tmp_path):
+    """Test that a script is found as soon as it is created after a failed run."""
+    script = tmp_path / "script.sh"
+    storage.add_command(Command("Script", "script", str(script), ""))
+    assert storage.execute_command(0) is False
+
+    script.write_text("#!/bin/sh\ntrue\n")
+    script.chmod(0o755)
+
+    assert storage.execute_command(0) is True
+
+
+def test_execute_unknown_command_type(storage):
+    """Test executing a command with an unknown type."""
+    storage.add_command(Command("Unknown", "bogus", "echo test", ""))
+
+    assert storage.execute_command(0) is False
+
+
 def test_execute_invalid_index(storage):
     """Test executing with invalid index."""
     result = storage.execute_command(5)
@@ -244,8 +761,8 @@ def test_execute_invalid_index(storage):
 def test_empty_storage_get_commands(storage):
     """Test getting commands from empty storage."""
     commands = storage.get_commands()
-    assert commands == []
-    assert isinstance(commands, list)
+    assert commands == ()
+    assert isinstance(commands, tuple)
 
 
 def test_multiple_add_operations(storage):
@@ -1,7 +1,11 @@
 """Unit tests for GUI widgets."""
 
+import threading
+from typing import List
+
 from pytestqt.qtbot import QtBot  # type: ignore
 
+import bashrunner.gui.main_window as main_window_module
 from bashrunner.core.command_storage import Command
 from bashrunner.gui.commands_config import (
     AddEditCommandDialog,
@@ -80,6 +84,19 @@ def test_command_edit_widget_script_type(qtbot: QtBot):
     assert widget._get_command_type() == "script"
 
 
+def test_command_edit_widget_set_command(qtbot: QtBot):
+    """Test reusing a CommandEditWidget for another command and for a new one."""
+    widget = CommandEditWidget(Command("Script", "script", "/path/to/script.sh", ""))
+    qtbot.addWidget(widget)
+
+    widget.set_command(Command("Multi", "multi", "echo 1\necho 2", "Two"))
+    assert widget.get_command() == Command("Multi", "multi", "echo 1\necho 2", "Two")
+    assert widget.file_path_edit.text() == ""
+
+    widget.set_command(None)
+    assert widget.get_command() == Command("", "single", "", "")
+
+
 def test_command_button_initialization(qtbot: QtBot):
     """Test CommandButton initialization."""
     cmd = Command("Test", "single", "echo hello", "Test tooltip")
@@ -91,9 +108,9 @@ def test_command_button_initialization(qtbot: QtBot):
     assert button.index == 0
 
 
-def test_main_window_initialization(qtbot: QtBot):
+def test_main_window_initialization(qtbot: QtBot, temp_storage):
     """Test MainWindow initialization."""
-    window = MainWindow()
+    window = MainWindow(temp_storage)
     qtbot.addWidget(window)
 
     assert window.windowTitle() == "BashRunner"
@@ -102,9 +119,9 @@ def test_main_window_initialization(qtbot: QtBot):
     assert window.buttons_layout is not None
 
 
-def test_commands_config_dialog_initialization(qtbot: QtBot):
+def test_commands_config_dialog_initialization(qtbot: QtBot, temp_storage):
     """Test CommandsConfigDialog initialization."""
-    dialog = CommandsConfigDialog()
+    dialog = CommandsConfigDialog(storage=temp_storage)
     qtbot.addWidget(dialog)
 
     assert dialog.windowTitle() == "Commands Configuration"
@@ -117,9 +134,9 @@ def test_commands_config_dialog_initialization(qtbot: QtBot):
     assert dialog.close_button is not None
 
 
-def test_commands_config_dialog_button_states(qtbot: QtBot):
+def test_commands_config_dialog_button_states(qtbot: QtBot, temp_storage):
     """Test button states in CommandsConfigDialog."""
-    dialog = CommandsConfigDialog()
+    dialog = CommandsConfigDialog(storage=temp_storage)
     qtbot.addWidget(dialog)
 
     # With no selection, buttons should be disabled
@@ -202,6 +219,31 @@ def test_settings_dialog_default_values(qtbot: QtBot):
     assert settings["grid_columns"] == 4
 
 
+def test_settings_dialog_cancel_discards_edits(qtbot: QtBot, temp_storage, monkeypatch):
+    """Test that a cancelled edit is gone when the reused dialog is reopened."""
+
+    def edit_and(close, columns):
+        def exec(self):
+            self.columns_spinbox.setValue(columns)
+            close(self)
+            return self.result()
+
+        return exec
+
+    window = MainWindow(temp_storage)
+    qtbot.addWidget(window)
+
+    monkeypatch.setattr(SettingsDialog, "exec", edit_and(SettingsDialog.reject, 2))
+    window._show_settings()
+    assert window._settings_dialog.get_settings()["grid_columns"] == 4
+
+    monkeypatch.setattr(SettingsDialog, "exec", edit_and(SettingsDialog.accept, 3))
+    window._show_settings()
+    monkeypatch.setattr(SettingsDialog, "exec", edit_and(SettingsDialog.reject, 6))
+    window._show_settings()
+    assert window._settings_dialog.get_settings()["grid_columns"] == 3
+
+
 def test_console_view_initialization(qtbot: QtBot):
     """Test ConsoleView initialization."""
     console = ConsoleView()
@@ -209,6 +251,8 @@ def test_console_view_initialization(qtbot: QtBot):
 
     assert console.console_text is not None
     assert console.console_text.isReadOnly()
+    assert not console.console_text.isUndoRedoEnabled()
+    assert console.console_text.maximumBlockCount() > 0
     assert console.console_text.toPlainText() == ""
 
 
@@ -220,9 +264,10 @@ def test_console_view_append_output(qtbot: QtBot):
     console.append_output("Test output\n")
     console.append_output("More output\n")
 
-    text = console.console_text.toPlainText()
-    assert "Test output" in text
-    assert "More output" in text
+    # Output is drawn in one batch once the flush timer fires
+    assert console.console_text.toPlainText() == ""
+    qtbot.waitUntil(lambda: "More output" in console.console_text.toPlainText())
+    assert "Test output" in console.console_text.toPlainText()
 
 
 def test_console_view_append_error(qtbot: QtBot):
@@ -232,8 +277,8 @@ def test_console_view_append_error(qtbot: QtBot):
 
     console.append_error("Error message\n")
 
-    # Check that text was added (HTML parsing makes exact match difficult)
-    assert len(console.console_text.toPlainText()) > 0
+    qtbot.waitUntil(lambda: len(console.console_text.toPlainText()) > 0)
+    assert console.console_text.toPlainText() == "Error message\n"
 
 
 def test_console_view_clear(qtbot: QtBot):
@@ -242,26 +287,121 @@ def test_console_view_clear(qtbot: QtBot):
     qtbot.addWidget(console)
 
     console.append_output("Test output\n")
-    assert len(console.console_text.toPlainText()) > 0
+    qtbot.waitUntil(lambda: len(console.console_text.toPlainText()) > 0)
 
     console.clear()
     assert console.console_text.toPlainText() == ""
 
+    # Output still buffered when the console is cleared is dropped too
+    console.append_output("Pending output\n")
+    console.clear()
+    qtbot.wait(50)
+    assert console.console_text.toPlainText() == ""
+
+
+def test_console_view_strips_split_ansi_codes(qtbot: QtBot):
+    """Test that an escape sequence split across appends is still stripped."""
+    console = ConsoleView()
+    qtbot.addWidget(console)
+
+    console.append_output("\x1b[3")
+    console.append_output("1mred\x1b[0m\n")
 
-def test_main_window_has_console_view(qtbot: QtBot):
-    """Test that MainWindow has console view."""
-    window = MainWindow()
+    qtbot.waitUntil(lambda: "red" in console.console_text.toPlainText())
+    assert console.console_text.toPlainText() == "red\n"
+
+
+def test_main_window_has_console_view(qtbot: QtBot, temp_storage):
+    """Test that MainWindow creates its console view when it is first shown."""
+    window = MainWindow(temp_storage)
     qtbot.addWidget(window)
 
+    assert window.console_view is None
+    window._switch_view(1)
     assert window.console_view is not None
+    assert window.stacked_widget.currentWidget() is window.console_view
     assert window.stacked_widget is not None
     assert window.main_tab_button is not None
     assert window.console_tab_button is not None
 
 
-def test_main_window_switch_view(qtbot: QtBot):
+def test_main_window_replays_output_into_new_console(qtbot: QtBot, temp_storage):
+    """Test that output received before the console exists is shown once it opens."""
+    window = MainWindow(temp_storage)
+    qtbot.addWidget(window)
+
+    window._on_command_output("before\n")
+    window._on_command_error("failed\n")
+    qtbot.waitUntil(lambda: len(window._console_backlog) == 2)
+
+    window._switch_view(1)
+    window._on_command_output("after\n")
+
+    console_text = window.console_view.console_text
+    qtbot.waitUntil(lambda: "after" in console_text.toPlainText())
+    assert console_text.toPlainText() == "before\nfailed\nafter\n"
+
+
+def test_main_window_reports_dropped_output(qtbot: QtBot, temp_storage, monkeypatch):
+    """Test that output dropped from a full queue is reported in the console."""
+    monkeypatch.setattr(main_window_module, "_CONSOLE_BACKLOG", 2)
+    window = MainWindow(temp_storage)
+    qtbot.addWidget(window)
+    window._switch_view(1)
+
+    # Nothing drains until control returns to the event loop
+    for i in range(5):
+        window._on_command_output(f"{i}\n")
+
+    console_text = window.console_view.console_text
+    qtbot.waitUntil(lambda: "4" in console_text.toPlainText())
+    assert console_text.toPlainText() == "[… 3 chunks dropped]\n3\n4\n"
+
+
+def test_main_window_coalesces_output_from_worker_thread(qtbot: QtBot, temp_storage):
+    """Test that output from another thread reaches the console in order, in few batches."""
+    window = MainWindow(temp_storage)
+    qtbot.addWidget(window)
+    console = window._ensure_console_view()
+    received: List[str] = []
+    console.append_output = received.append
+
+    def produce():
+        for i in range(500):
+            window._on_command_output(f"{i}\n")
+
+    worker = threading.Thread(target=produce)
+    worker.start()
+    worker.join()
+
+    qtbot.waitUntil(lambda: not window._out_scheduled)
+    assert "".join(received) == "".join(f"{i}\n" for i in range(500))
+    assert len(received) < 500
+
+
+def test_main_window_reuses_dialogs(qtbot: QtBot, temp_storage, monkeypatch):
+    """Test that the configuration dialogs are built once and reused."""
+    monkeypatch.setattr(CommandsConfigDialog, "exec", lambda self: 0)
+    monkeypatch.setattr(SettingsDialog, "exec", lambda self: 0)
+    window = MainWindow(temp_storage)
+    qtbot.addWidget(window)
+
+    window._show_commands_config()
+    commands_dialog = window._commands_dialog
+    window._show_commands_config()
+    window._show_settings()
+    settings_dialog = window._settings_dialog
+    window._show_settings()
+
+    assert commands_dialog is not None
+    assert window._commands_dialog is commands_dialog
+    assert settings_dialog is not None
+    assert window._settings_dialog is settings_dialog
+
+
+def test_main_window_switch_view(qtbot: QtBot, temp_storage):
     """Test switching views in MainWindow."""
-    window = MainWindow()
+    window = MainWindow(temp_storage)
     qtbot.addWidget(window)
 
     # Initially on main view
@@ -280,3 +420,17 @@ def test_main_window_switch_view(qtbot: QtBot):
     assert window.stacked_widget.currentIndex() == 0
     assert window.main_tab_button.isChecked()
     assert not window.console_tab_button.isChecked()
+
+
+def test_main_window_tab_buttons_switch_view(qtbot: QtBot, temp_storage):
+    """Test that clicking the tab buttons switches views exclusively."""
+    window = MainWindow(temp_storage)
+    qtbot.addWidget(window)
+
+    window.console_tab_button.click()
+    assert window.stacked_widget.currentIndex() == 1
+    assert not window.main_tab_button.isChecked()
+
+    window.main_tab_button.click()
+    assert window.stacked_widget.currentIndex() == 0
+    assert not window.console_tab_button.isChecked()
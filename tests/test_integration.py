@@ -1,81 +1,57 @@
 """Integration tests for user workflows."""
 
-import tempfile
-from pathlib import Path
-
 import pytest
-from PySide6.QtCore import Qt  # type: ignore
-from PySide6.QtWidgets import QDialog, QMessageBox  # type: ignore
+from PySide6.QtWidgets import QDialog  # type: ignore
 from pytestqt.qtbot import QtBot  # type: ignore
 
-from bashrunner.core.command_storage import Command, CommandStorage
-from bashrunner.gui.commands_config import CommandsConfigDialog
+from bashrunner.core.command_storage import Command
+from bashrunner.gui.commands_config import AddEditCommandDialog, CommandsConfigDialog
 from bashrunner.gui.main_window import MainWindow
 
 
-@pytest.fixture
-def temp_storage():
-    """Create a temporary storage for testing."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        storage = CommandStorage(Path(tmpdir))
-        yield storage
+def _accept_command_dialog(monkeypatch, name, content, description="", type_text=None):
+    """Make the add/edit dialog fill in the given fields and accept instead of blocking."""
 
+    def exec(self):
+        if type_text is not None:
+            self.edit_widget.type_combo.setCurrentText(type_text)
+        self.edit_widget.name_edit.setText(name)
+        self.edit_widget.content_edit.setPlainText(content)
+        self.edit_widget.description_edit.setText(description)
+        return QDialog.DialogCode.Accepted
 
-def test_add_and_save_new_command_workflow(qtbot: QtBot, temp_storage, monkeypatch):
-    """Test the complete workflow of adding and saving a new command."""
-    # Monkey patch the storage in the dialog module
-    import bashrunner.gui.commands_config as config_module
-    from bashrunner.gui.commands_config import AddEditCommandDialog
+    monkeypatch.setattr(AddEditCommandDialog, "exec", exec)
 
-    monkeypatch.setattr(config_module, "command_storage", temp_storage)
 
-    dialog = CommandsConfigDialog()
+def test_add_and_save_new_command_workflow(qtbot: QtBot, temp_storage, monkeypatch):
+    """Test the complete workflow of adding and saving a new command."""
+    dialog = CommandsConfigDialog(storage=temp_storage)
     qtbot.addWidget(dialog)
 
     # Initial state - no commands
     assert dialog.commands_list.count() == 0
 
-    # Mock the AddEditCommandDialog to return a command
-    class MockAddDialog(AddEditCommandDialog):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            self.edit_widget.name_edit.setText("Test Command")
-            self.edit_widget.content_edit.setPlainText("echo hello")
-            self.edit_widget.description_edit.setText("A test command")
+    _accept_command_dialog(monkeypatch, "Test Command", "echo hello", "A test command")
 
-        def exec(self):
-            return QDialog.DialogCode.Accepted
-
-    # Patch the dialog creation
-    monkeypatch.setattr(config_module, "AddEditCommandDialog", MockAddDialog)
-
-    # Click Add button (this will trigger the mocked dialog)
+    # Add through the (patched) dialog
     dialog._add_command()
 
-    # Command should be added to the list
+    # Command should be added to the list and selected
     assert dialog.commands_list.count() == 1
     assert dialog.commands_list.item(0).text() == "Test Command"
+    assert dialog.commands_list.currentRow() == 0
 
     # Verify in storage
-    commands = temp_storage.get_commands()
-    assert len(commands) == 1
-    assert commands[0].name == "Test Command"
-    assert commands[0].content == "echo hello"
+    assert temp_storage.get_commands() == (
+        Command("Test Command", "single", "echo hello", "A test command"),
+    )
 
 
-def test_edit_existing_command_workflow(qtbot: QtBot, temp_storage, monkeypatch):
+def test_edit_existing_command_workflow(qtbot: QtBot, storage_with, monkeypatch):
     """Test the complete workflow of editing an existing command."""
-    # Add a command to storage
-    cmd = Command("Original", "single", "echo original", "")
-    temp_storage.add_command(cmd)
-
-    # Monkey patch the storage
-    import bashrunner.gui.commands_config as config_module
-    from bashrunner.gui.commands_config import AddEditCommandDialog
+    temp_storage = storage_with(Command("Original", "single", "echo original", ""))
 
-    monkeypatch.setattr(config_module, "command_storage", temp_storage)
-
-    dialog = CommandsConfigDialog()
+    dialog = CommandsConfigDialog(storage=temp_storage)
     qtbot.addWidget(dialog)
 
     # Should have one command
@@ -84,42 +60,39 @@ def test_edit_existing_command_workflow(qtbot: QtBot, temp_storage, monkeypatch)
     # Select the command
     dialog.commands_list.setCurrentRow(0)
 
-    # Mock the AddEditCommandDialog for editing
-    class MockEditDialog(AddEditCommandDialog):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            self.edit_widget.name_edit.setText("Modified")
-            self.edit_widget.content_edit.setPlainText("echo modified")
-
-        def exec(self):
-            return QDialog.DialogCode.Accepted
-
-    monkeypatch.setattr(config_module, "AddEditCommandDialog", MockEditDialog)
+    _accept_command_dialog(monkeypatch, "Modified", "echo modified")
 
     # Trigger edit
     dialog._edit_command()
 
     # Verify changes
-    commands = temp_storage.get_commands()
-    assert len(commands) == 1
-    assert commands[0].name == "Modified"
-    assert commands[0].content == "echo modified"
+    assert temp_storage.get_commands() == (Command("Modified", "single", "echo modified", ""),)
 
 
-def test_delete_command_workflow(qtbot: QtBot, temp_storage, monkeypatch):
-    """Test the complete workflow of deleting a command."""
-    # Add commands to storage
-    cmd1 = Command("Command1", "single", "echo 1", "")
-    cmd2 = Command("Command2", "single", "echo 2", "")
-    temp_storage.add_command(cmd1)
-    temp_storage.add_command(cmd2)
+def test_command_dialog_is_reused(qtbot: QtBot, storage_with):
+    """Test that adding and editing share one AddEditCommandDialog."""
+    temp_storage = storage_with(Command("Original", "single", "echo original", ""))
+
+    dialog = CommandsConfigDialog(storage=temp_storage)
+    qtbot.addWidget(dialog)
 
-    # Monkey patch the storage
-    import bashrunner.gui.commands_config as config_module
+    add_dialog = dialog._get_command_dialog(None)
+    assert add_dialog.windowTitle() == "Add Command"
 
-    monkeypatch.setattr(config_module, "command_storage", temp_storage)
+    edit_dialog = dialog._get_command_dialog(temp_storage.get_commands()[0])
+    assert edit_dialog is add_dialog
+    assert edit_dialog.windowTitle() == "Edit Command"
+    assert edit_dialog.get_command().name == "Original"
 
-    dialog = CommandsConfigDialog()
+
+def test_delete_command_workflow(qtbot: QtBot, storage_with, mock_dialogs):
+    """Test the complete workflow of deleting a command."""
+    temp_storage = storage_with(
+        Command("Command1", "single", "echo 1", ""),
+        Command("Command2", "single", "echo 2", ""),
+    )
+
+    dialog = CommandsConfigDialog(storage=temp_storage)
     qtbot.addWidget(dialog)
 
     # Should have two commands
@@ -128,89 +101,47 @@ def test_delete_command_workflow(qtbot: QtBot, temp_storage, monkeypatch):
     # Select first command
     dialog.commands_list.setCurrentRow(0)
 
-    # Mock the confirmation dialog to return Yes
-    monkeypatch.setattr(
-        QMessageBox, "question", lambda *args, **kwargs: QMessageBox.StandardButton.Yes
-    )
-
     # Delete
-    qtbot.mouseClick(dialog.delete_button, Qt.MouseButton.LeftButton)
+    dialog.delete_button.click()
 
     # Should have one command left
     assert dialog.commands_list.count() == 1
     assert dialog.commands_list.item(0).text() == "Command2"
 
-    commands = temp_storage.get_commands()
-    assert len(commands) == 1
-    assert commands[0].name == "Command2"
-
-
-def test_move_command_up_workflow(qtbot: QtBot, temp_storage, monkeypatch):
-    """Test the complete workflow of moving a command up."""
-    # Add commands to storage
-    cmd1 = Command("First", "single", "echo 1", "")
-    cmd2 = Command("Second", "single", "echo 2", "")
-    temp_storage.add_command(cmd1)
-    temp_storage.add_command(cmd2)
+    assert [command.name for command in temp_storage.get_commands()] == ["Command2"]
+    assert mock_dialogs["question"] == 1
 
-    # Monkey patch the storage
-    import bashrunner.gui.commands_config as config_module
 
-    monkeypatch.setattr(config_module, "command_storage", temp_storage)
+@pytest.mark.parametrize(
+    "start_row, button_name, end_row",
+    [(1, "move_up_button", 0), (0, "move_down_button", 1)],
+)
+def test_move_command_workflow(qtbot: QtBot, storage_with, start_row, button_name, end_row):
+    """Test the complete workflow of moving a command up or down."""
+    temp_storage = storage_with(
+        Command("First", "single", "echo 1", ""),
+        Command("Second", "single", "echo 2", ""),
+    )
 
-    dialog = CommandsConfigDialog()
+    dialog = CommandsConfigDialog(storage=temp_storage)
     qtbot.addWidget(dialog)
 
-    # Select second command
-    dialog.commands_list.setCurrentRow(1)
-
-    # Move up
-    qtbot.mouseClick(dialog.move_up_button, Qt.MouseButton.LeftButton)
+    dialog.commands_list.setCurrentRow(start_row)
+    getattr(dialog, button_name).click()
 
-    # Order should be reversed
+    # Order should be reversed, in the list and in storage
     assert dialog.commands_list.item(0).text() == "Second"
     assert dialog.commands_list.item(1).text() == "First"
+    assert [command.name for command in temp_storage.get_commands()] == ["Second", "First"]
 
-    commands = temp_storage.get_commands()
-    assert commands[0].name == "Second"
-    assert commands[1].name == "First"
-
-
-def test_move_command_down_workflow(qtbot: QtBot, temp_storage, monkeypatch):
-    """Test the complete workflow of moving a command down."""
-    # Add commands to storage
-    cmd1 = Command("First", "single", "echo 1", "")
-    cmd2 = Command("Second", "single", "echo 2", "")
-    temp_storage.add_command(cmd1)
-    temp_storage.add_command(cmd2)
+    # Selection follows the moved command, which can't move further that way
+    assert dialog.commands_list.currentRow() == end_row
+    assert not getattr(dialog, button_name).isEnabled()
 
-    # Monkey patch the storage
-    import bashrunner.gui.commands_config as config_module
 
-    monkeypatch.setattr(config_module, "command_storage", temp_storage)
-
-    dialog = CommandsConfigDialog()
-    qtbot.addWidget(dialog)
-
-    # Select first command
-    dialog.commands_list.setCurrentRow(0)
-
-    # Move down
-    qtbot.mouseClick(dialog.move_down_button, Qt.MouseButton.LeftButton)
-
-    # Order should be reversed
-    assert dialog.commands_list.item(0).text() == "Second"
-    assert dialog.commands_list.item(1).text() == "First"
-
-
-def test_main_window_refresh_after_command_update(qtbot: QtBot, temp_storage, monkeypatch):
+def test_main_window_refresh_after_command_update(qtbot: QtBot, temp_storage):
     """Test that main window refreshes after commands are updated."""
-    # Monkey patch the storage
-    import bashrunner.gui.main_window as main_module
-
-    monkeypatch.setattr(main_module, "command_storage", temp_storage)
-
-    window = MainWindow()
+    window = MainWindow(temp_storage)
     qtbot.addWidget(window)
 
     # Initially no commands
@@ -227,77 +158,63 @@ def test_main_window_refresh_after_command_update(qtbot: QtBot, temp_storage, mo
     assert window.buttons_layout.count() == 1
 
 
-def test_validation_empty_name(qtbot: QtBot, temp_storage, monkeypatch):
-    """Test validation when saving a command with empty name."""
-    # Monkey patch the storage
-    import bashrunner.gui.commands_config as config_module
-    from bashrunner.gui.commands_config import AddEditCommandDialog
-
-    monkeypatch.setattr(config_module, "command_storage", temp_storage)
-
-    dialog = CommandsConfigDialog()
-    qtbot.addWidget(dialog)
+def test_main_window_refresh_reuses_buttons(qtbot: QtBot, storage_with):
+    """Test that refreshing updates existing buttons instead of recreating them."""
+    temp_storage = storage_with(
+        *(Command(name, "single", "echo", "") for name in ["First", "Second", "Third"])
+    )
 
-    # Mock the AddEditCommandDialog with empty name
-    class MockAddDialog(AddEditCommandDialog):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            # Leave name empty, but fill content
-            self.edit_widget.name_edit.setText("")
-            self.edit_widget.content_edit.setPlainText("echo test")
+    window = MainWindow(temp_storage)
+    qtbot.addWidget(window)
+    buttons = list(window._buttons)
+    assert [button.text() for button in buttons] == ["First", "Second", "Third"]
 
-        def exec(self):
-            return QDialog.DialogCode.Accepted
+    temp_storage.update_command(1, Command("Renamed", "single", "echo", ""))
+    temp_storage.delete_command(2)
+    window._refresh_buttons()
 
-    monkeypatch.setattr(config_module, "AddEditCommandDialog", MockAddDialog)
+    assert window._buttons == buttons[:2]
+    assert [button.text() for button in window._buttons] == ["First", "Renamed"]
+    assert window.buttons_layout.count() == 2
 
-    # Mock warning dialog
-    warning_called = []
-    monkeypatch.setattr(QMessageBox, "warning", lambda *args: warning_called.append(True))
+    temp_storage.delete_command(1)
+    temp_storage.delete_command(0)
+    window._refresh_buttons()
 
-    # Try to add command
-    dialog._add_command()
+    assert window._buttons == []
+    assert window.buttons_layout.count() == 1
+    assert window._empty_label is not None
 
-    # Should show warning
-    assert len(warning_called) > 0
 
-    # Should not be added to storage
-    assert len(temp_storage.get_commands()) == 0
+def test_main_window_defers_refresh_while_console_shown(qtbot: QtBot, temp_storage):
+    """Test that button refreshes wait until the commands view is shown again."""
+    window = MainWindow(temp_storage)
+    qtbot.addWidget(window)
+    window._switch_view(1)
 
+    temp_storage.add_command(Command("NewCmd", "single", "echo new", ""))
+    window._request_button_refresh()
+    assert window._buttons == []
 
-def test_validation_empty_content(qtbot: QtBot, temp_storage, monkeypatch):
-    """Test validation when saving a command with empty content."""
-    # Monkey patch the storage
-    import bashrunner.gui.commands_config as config_module
-    from bashrunner.gui.commands_config import AddEditCommandDialog
+    window._switch_view(0)
+    assert [button.text() for button in window._buttons] == ["NewCmd"]
 
-    monkeypatch.setattr(config_module, "command_storage", temp_storage)
 
-    dialog = CommandsConfigDialog()
+@pytest.mark.parametrize("name, content", [("", "echo test"), ("Test", "")])
+def test_validation_missing_field(
+    qtbot: QtBot, temp_storage, monkeypatch, mock_dialogs, name, content
+):
+    """Test validation when saving a command with an empty name or content."""
+    dialog = CommandsConfigDialog(storage=temp_storage)
     qtbot.addWidget(dialog)
 
-    # Mock the AddEditCommandDialog with empty content
-    class MockAddDialog(AddEditCommandDialog):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            # Fill name but leave content empty
-            self.edit_widget.name_edit.setText("Test")
-            self.edit_widget.content_edit.setPlainText("")
-
-        def exec(self):
-            return QDialog.DialogCode.Accepted
-
-    monkeypatch.setattr(config_module, "AddEditCommandDialog", MockAddDialog)
-
-    # Mock warning dialog
-    warning_called = []
-    monkeypatch.setattr(QMessageBox, "warning", lambda *args: warning_called.append(True))
+    _accept_command_dialog(monkeypatch, name, content)
 
     # Try to add command
     dialog._add_command()
 
     # Should show warning
-    assert len(warning_called) > 0
+    assert mock_dialogs["warning"] == 1
 
     # Should not be added to storage
     assert len(temp_storage.get_commands()) == 0
@@ -305,35 +222,20 @@ def test_validation_empty_content(qtbot: QtBot, temp_storage, monkeypatch):
 
 def test_multi_command_type_workflow(qtbot: QtBot, temp_storage, monkeypatch):
     """Test creating a multi-command type."""
-    # Monkey patch the storage
-    import bashrunner.gui.commands_config as config_module
-    from bashrunner.gui.commands_config import AddEditCommandDialog
-
-    monkeypatch.setattr(config_module, "command_storage", temp_storage)
-
-    dialog = CommandsConfigDialog()
+    dialog = CommandsConfigDialog(storage=temp_storage)
     qtbot.addWidget(dialog)
 
-    # Mock the AddEditCommandDialog with multi-command type
-    class MockAddDialog(AddEditCommandDialog):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            # Set to multi command type
-            self.edit_widget.type_combo.setCurrentText("Multiple Commands")
-            self.edit_widget.name_edit.setText("Multi")
-            self.edit_widget.content_edit.setPlainText("echo line1\necho line2\necho line3")
-
-        def exec(self):
-            return QDialog.DialogCode.Accepted
-
-    monkeypatch.setattr(config_module, "AddEditCommandDialog", MockAddDialog)
+    _accept_command_dialog(
+        monkeypatch,
+        "Multi",
+        "echo line1\necho line2\necho line3",
+        type_text="Multiple Commands",
+    )
 
     # Add command
     dialog._add_command()
 
     # Verify
-    commands = temp_storage.get_commands()
-    assert len(commands) == 1
-    assert commands[0].command_type == "multi"
-    assert "echo line1" in commands[0].content
-    assert "echo line2" in commands[0].content
+    assert temp_storage.get_commands() == (
+        Command("Multi", "multi", "echo line1\necho line2\necho line3", ""),
+    )